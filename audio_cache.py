@@ -0,0 +1,152 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+
+class AudioCache:
+    """
+    Content-addressed on-disk cache of synthesized chunk audio.
+    Entries are keyed by a hash of (text, voice, speed, model version) and stored
+    as .npy files (float32, or int16 to halve the size) that are memory-mapped on
+    read. Least recently used files are evicted once the cache exceeds max_bytes.
+    """
+    def __init__(self, root, max_bytes=512 * 1024 * 1024, dtype="float32"):
+        if dtype not in ("float32", "int16"):
+            raise ValueError(f"Unsupported audio cache dtype: {dtype}")
+        self.root = root
+        self.max_bytes = max_bytes
+        self.dtype = dtype
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._bytes = sum(size for _, size, _ in self._scan())
+
+    @staticmethod
+    def key(text, voice, speed, model_version):
+        payload = json.dumps([text, voice, speed, model_version], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.root, key + ".npy")
+
+    def _scan(self):
+        """(mtime, size, path) of every entry. Other processes (e.g. synth_pool
+        workers) evict from the same directory, so files that vanish are skipped."""
+        entries = []
+        for entry in os.scandir(self.root):
+            if not entry.name.endswith(".npy"):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, entry.path))
+        return entries
+
+    def get(self, key):
+        """Return cached float32 audio (memory-mapped when stored as float32) or None."""
+        path = self._path(key)
+        try:
+            audio = np.load(path, mmap_mode="r")
+            os.utime(path)  # mtime doubles as the LRU timestamp
+        except (FileNotFoundError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        if audio.dtype == np.int16:
+            return audio.astype(np.float32) / 32767
+        return audio
+
+    def put(self, key, audio):
+        audio = np.asarray(audio, dtype=np.float32)
+        if self.dtype == "int16":
+            audio = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            np.save(f, audio)
+        # Sized before the rename: another process may evict the entry right after it
+        size = os.path.getsize(tmp)
+        try:
+            size -= os.path.getsize(path)  # an overwritten entry frees its old size
+        except FileNotFoundError:
+            pass
+        os.replace(tmp, path)
+        with self._lock:
+            self._bytes += size
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Trim to 90% of the budget so eviction does not rescan on every put
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._bytes = total
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes": self._bytes,
+            }
+
+def _version(repo_id, dtype, precision):
+    import kokoro
+    version = f"{repo_id}/kokoro-{kokoro.__version__}/{dtype}"
+    # fp32 keeps its original key so existing caches stay valid
+    return version if precision == "fp32" else f"{version}/{precision}"
+
+def model_version(model):
+    """Identify the weights and numeric format a model produces audio with."""
+    dtype = next(model.parameters()).dtype
+    return _version(getattr(model, "repo_id", "hexgrad/Kokoro-82M"), dtype, getattr(model, "precision", "fp32"))
+
+def registry_model_version(precision=None):
+    """
+    model_version of the KModel tts_registry.get_model loads at precision (its
+    weights stay float32 at every precision), without loading it.
+    """
+    import torch
+    from precision import default_precision
+    return _version("hexgrad/Kokoro-82M", torch.float32, precision or default_precision())
+
+def chunk_key(model, text, voice, speed=1):
+    """Audio cache key for one text chunk synthesized by model."""
+    return AudioCache.key(text, voice, speed, model_version(model))
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_audio_cache():
+    """
+    Process-wide audio cache, enabled by setting KOKORO_AUDIO_CACHE to a directory.
+    KOKORO_AUDIO_CACHE_MB sets its size (default 512) and KOKORO_AUDIO_CACHE_DTYPE
+    its storage format (float32 or int16). Returns None when disabled.
+    """
+    global _default_cache
+    root = os.environ.get("KOKORO_AUDIO_CACHE")
+    if not root:
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = AudioCache(
+                root,
+                max_bytes=int(float(os.environ.get("KOKORO_AUDIO_CACHE_MB", 512)) * 1024 * 1024),
+                dtype=os.environ.get("KOKORO_AUDIO_CACHE_DTYPE", "float32"),
+            )
+        return _default_cache
@@ -0,0 +1,62 @@
+import subprocess
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 24000
+
+class WavSink:
+    """Append audio chunks to a WAV file as they are synthesized."""
+    def __init__(self, path, samplerate=SAMPLE_RATE):
+        self.path = path
+        self._file = sf.SoundFile(path, 'w', samplerate=samplerate, channels=1)
+
+    def write(self, audio):
+        self._file.write(audio)
+
+    def close(self):
+        self._file.close()
+
+class MpvSink:
+    """Play audio chunks through mpv as they arrive (raw float32 PCM on stdin)."""
+    def __init__(self, samplerate=SAMPLE_RATE):
+        self._proc = subprocess.Popen(
+            ["mpv", "--no-terminal", "--demuxer=rawaudio", "--demuxer-rawaudio-format=floatle",
+             "--demuxer-rawaudio-channels=1", f"--demuxer-rawaudio-rate={samplerate}", "-"],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+
+    def write(self, audio):
+        if self._proc.stdin is None:
+            return
+        try:
+            self._proc.stdin.write(np.asarray(audio, dtype='<f4').tobytes())
+        except BrokenPipeError:
+            # Player was closed; keep synthesizing to the other sinks
+            self._proc.stdin = None
+
+    def close(self):
+        if self._proc.stdin is not None:
+            try:
+                self._proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        self._proc.wait()
+
+class TeeSink:
+    """Write every chunk to several sinks; usable as a context manager."""
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+
+    def write(self, audio):
+        for sink in self.sinks:
+            sink.write(audio)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
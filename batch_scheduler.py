@@ -0,0 +1,149 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from batch_synth import fits_context, forward_batch
+from audio_cache import chunk_key
+from text_splitter import split_text_for_tts, phonemize, style_for, synthesize_cached_chunk
+
+class BatchScheduler:
+    """
+    Runs chunks from concurrent requests through one model in shared padded batches.
+    A batch is closed once it holds max_batch chunks or its oldest chunk has waited
+    max_wait_ms, so batching adds at most max_wait_ms to any chunk's latency.
+    submit() returns a Future with the chunk's audio; per-chunk latency (submit to
+    result) is kept for the last `history` chunks so stats() can report p50/p99.
+    """
+    def __init__(self, model, max_batch=8, max_wait_ms=20, history=1000):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self._pending = queue.Queue()
+        self._latencies = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, ps, ref_s, speed=1):
+        """Queue one phoneme string (which must fit the model context) for batched synthesis."""
+        future = Future()
+        self._pending.put((ps, ref_s, speed, future, time.time()))
+        return future
+
+    def iter_chunks(self, pipeline, pack, text, voice, speed=1, audio_cache=None):
+        """
+        Yield the audio of text's chunks in order. Up to max_batch chunks are submitted
+        ahead, so a request's own chunks share batches as well as other requests'.
+        Chunks that do not fit the model context go through synthesize_cached_chunk.
+        """
+        ahead = deque()
+        try:
+            for chunk in split_text_for_tts(text, lang_code=pipeline.lang_code):
+                ahead.append(self._start_chunk(pipeline, pack, chunk, voice, speed, audio_cache))
+                if len(ahead) >= self.max_batch:
+                    yield from self._finish_chunk(pipeline, pack, voice, speed, audio_cache, *ahead.popleft())
+            while ahead:
+                yield from self._finish_chunk(pipeline, pack, voice, speed, audio_cache, *ahead.popleft())
+        finally:
+            # The consumer stopped early (e.g. the client went away): drop queued work
+            for _, _, pending in ahead:
+                if isinstance(pending, Future):
+                    pending.cancel()
+
+    def _start_chunk(self, pipeline, pack, chunk, voice, speed, audio_cache):
+        """Return (chunk, cache key, pending) where pending is cached audio, a Future, or None."""
+        key = None
+        if audio_cache is not None:
+            key = chunk_key(self.model, chunk, voice, speed)
+            audio = audio_cache.get(key)
+            if audio is not None:
+                return chunk, key, audio
+        ps = phonemize(pipeline, chunk)
+        if ps and fits_context(self.model, ps):
+            return chunk, key, self.submit(ps, style_for(pack, ps), speed)
+        return chunk, key, None
+
+    def _finish_chunk(self, pipeline, pack, voice, speed, audio_cache, chunk, key, pending):
+        if pending is None:
+            yield from synthesize_cached_chunk(pipeline, self.model, pack, chunk, voice, audio_cache, speed)
+            return
+        if isinstance(pending, Future):
+            pending = pending.result()
+            if audio_cache is not None:
+                audio_cache.put(key, pending)
+        yield pending
+
+    def _collect(self):
+        """Block for the next chunk, then gather more until the batch is full or its wait is up."""
+        first = self._pending.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first[4] + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                item = self._pending.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                self._pending.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            # forward_batch takes one speed per pass
+            by_speed = {}
+            for item in batch:
+                by_speed.setdefault(item[2], []).append(item)
+            for speed, items in by_speed.items():
+                self._forward(items, speed)
+
+    def _forward(self, items, speed):
+        items = [item for item in items if item[3].set_running_or_notify_cancel()]
+        if not items:
+            return
+        try:
+            outputs = forward_batch(self.model, [item[0] for item in items], [item[1] for item in items], speed)
+        except Exception as e:
+            for item in items:
+                item[3].set_exception(e)
+            return
+        now = time.time()
+        with self._lock:
+            self.batches += 1
+            self.items += len(items)
+            self._latencies.extend(now - item[4] for item in items)
+        for item, audio in zip(items, outputs):
+            item[3].set_result(audio)
+
+    def stats(self):
+        """Batch counts and per-chunk latency percentiles (ms) over recent chunks."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            batches, items = self.batches, self.items
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+        return {
+            "batches": batches,
+            "items": items,
+            "mean_batch": items / batches if batches else 0.0,
+            "p50_ms": percentile(0.5),
+            "p99_ms": percentile(0.99),
+        }
+
+    def close(self):
+        self._pending.put(None)
+        self._thread.join()
@@ -0,0 +1,161 @@
+import threading
+import torch
+from contextlib import contextmanager
+from torch import nn
+from precision import autocast
+
+# Each predicted duration frame becomes 600 samples at 24 kHz (the decoder
+# doubles the frame rate for F0 and then upsamples by 300).
+SAMPLES_PER_FRAME = 600
+
+# forward_batch temporarily patches model layers, so batched calls must not overlap
+_batch_lock = threading.Lock()
+
+def phonemes_to_ids(model, ps):
+    """Map a phoneme string to KModel input ids, dropping unknown symbols like KModel.forward does."""
+    return [i for i in (model.vocab.get(p) for p in ps) if i is not None]
+
+def fits_context(model, ps):
+    """True if a phoneme string fits in the model context (including the two boundary tokens)."""
+    return len(ps) + 2 <= model.context_length
+
+def forward_single(model, ps, ref_s, speed=1):
+    """
+    Unbatched KModel forward that cannot overlap a batched pass while its layers
+    are patched. Runs at the model's precision and returns float32 audio.
+    """
+    with _batch_lock, torch.no_grad(), autocast(model):
+        return model(ps, ref_s, speed=speed).float()
+
+def _valid_mask(frames, x):
+    """(B, 1, T) mask of each item's valid steps, with frame counts scaled to x's time resolution."""
+    steps = x.shape[-1]
+    max_frames = int(frames.max())
+    valid = torch.div(frames * steps + max_frames - 1, max_frames, rounding_mode='floor')
+    return (torch.arange(steps, device=x.device)[None, :] < valid[:, None]).unsqueeze(1).to(x.dtype)
+
+@contextmanager
+def _frame_masks(model, frames):
+    """
+    Make the frame-level stages (F0/N predictor and decoder) treat each batch
+    item as if it were alone: AdaIN1d layers normalize over the item's own
+    frames only, and every convolution sees zeros past the item's end, just
+    like the implicit zero padding of an unbatched run.
+    """
+    from kokoro.istftnet import AdaIN1d
+
+    def masked_adain(layer):
+        def forward(x, s):
+            mask = _valid_mask(frames, x)
+            count = mask.sum(-1, keepdim=True)
+            mean = (x * mask).sum(-1, keepdim=True) / count
+            var = (((x - mean) * mask) ** 2).sum(-1, keepdim=True) / count
+            x_hat = (x - mean) / torch.sqrt(var + layer.norm.eps)
+            if layer.norm.affine:
+                x_hat = x_hat * layer.norm.weight[None, :, None] + layer.norm.bias[None, :, None]
+            h = layer.fc(s)
+            gamma, beta = torch.chunk(h.view(h.size(0), h.size(1), 1), chunks=2, dim=1)
+            return ((1 + gamma) * x_hat + beta) * mask
+        return forward
+
+    def mask_input(module, args):
+        return (args[0] * _valid_mask(frames, args[0]),) + args[1:]
+
+    stages = [model.decoder, model.predictor.F0, model.predictor.N]
+    layers = [m for stage in stages for m in stage.modules() if isinstance(m, AdaIN1d)]
+    convs = [m for stage in stages for m in stage.modules() if isinstance(m, (nn.Conv1d, nn.ConvTranspose1d))]
+    for layer in layers:
+        layer.forward = masked_adain(layer)
+    hooks = [conv.register_forward_pre_hook(mask_input) for conv in convs]
+    try:
+        yield
+    finally:
+        for layer in layers:
+            del layer.forward
+        for hook in hooks:
+            hook.remove()
+
+def _f0n_packed(predictor, en, s, frames):
+    """ProsodyPredictor.F0Ntrain with the shared LSTM run on packed (unpadded) frame sequences."""
+    packed = nn.utils.rnn.pack_padded_sequence(en.transpose(-1, -2), frames.cpu(), batch_first=True, enforce_sorted=False)
+    x, _ = predictor.shared(packed)
+    x, _ = nn.utils.rnn.pad_packed_sequence(x, batch_first=True, total_length=en.shape[-1])
+    F0 = x.transpose(-1, -2)
+    for block in predictor.F0:
+        F0 = block(F0, s)
+    F0 = predictor.F0_proj(F0)
+    N = x.transpose(-1, -2)
+    for block in predictor.N:
+        N = block(N, s)
+    N = predictor.N_proj(N)
+    return F0.squeeze(1), N.squeeze(1)
+
+@torch.no_grad()
+def forward_batch(model, phoneme_list, ref_styles, speed=1):
+    """
+    Run several phoneme strings through a KModel in one padded forward pass.
+    Mirrors KModel.forward_with_tokens with per-item lengths, masks and
+    alignments. Returns one float32 numpy waveform per input, trimmed to the
+    length that input would have produced on its own.
+    """
+    with autocast(model):
+        return _forward_batch(model, phoneme_list, ref_styles, speed)
+
+def _forward_batch(model, phoneme_list, ref_styles, speed):
+    device = model.device
+    ids = [phonemes_to_ids(model, ps) for ps in phoneme_list]
+    for seq in ids:
+        assert len(seq) + 2 <= model.context_length, (len(seq) + 2, model.context_length)
+    batch = len(ids)
+    lengths = torch.tensor([len(seq) + 2 for seq in ids], dtype=torch.long)
+    max_len = int(lengths.max())
+    input_ids = torch.zeros((batch, max_len), dtype=torch.long)
+    for b, seq in enumerate(ids):
+        input_ids[b, 1:len(seq) + 1] = torch.tensor(seq, dtype=torch.long)
+    input_ids = input_ids.to(device)
+    text_mask = (torch.arange(max_len).unsqueeze(0) >= lengths.unsqueeze(1)).to(device)
+    ref_s = torch.stack([r.reshape(-1) for r in ref_styles]).to(device)
+    s = ref_s[:, 128:]
+
+    bert_dur = model.bert(input_ids, attention_mask=(~text_mask).int())
+    d_en = model.bert_encoder(bert_dur).transpose(-1, -2)
+    d = model.predictor.text_encoder(d_en, s, lengths.to(device), text_mask)
+    # Pack so the backward LSTM direction starts at each item's real end, not at padding
+    packed = nn.utils.rnn.pack_padded_sequence(d, lengths, batch_first=True, enforce_sorted=False)
+    x, _ = model.predictor.lstm(packed)
+    x, _ = nn.utils.rnn.pad_packed_sequence(x, batch_first=True, total_length=max_len)
+    duration = torch.sigmoid(model.predictor.duration_proj(x)).sum(axis=-1) / speed
+    pred_dur = torch.round(duration).clamp(min=1).long().masked_fill(text_mask, 0)
+    frames = pred_dur.sum(dim=1)
+
+    pred_aln_trg = torch.zeros((batch, max_len, int(frames.max())), device=device)
+    positions = torch.arange(max_len, device=device)
+    for b in range(batch):
+        indices = torch.repeat_interleave(positions, pred_dur[b])
+        pred_aln_trg[b, indices, torch.arange(indices.shape[0], device=device)] = 1
+    en = d.transpose(-1, -2) @ pred_aln_trg
+    t_en = model.text_encoder(input_ids, lengths.to(device), text_mask)
+    asr = t_en @ pred_aln_trg
+    with _batch_lock, _frame_masks(model, frames):
+        F0_pred, N_pred = _f0n_packed(model.predictor, en, s, frames)
+        audio = model.decoder(asr, F0_pred, N_pred, ref_s[:, :128]).reshape(batch, -1)
+
+    outputs = []
+    for b in range(batch):
+        n = int(frames[b]) * SAMPLES_PER_FRAME
+        outputs.append(audio[b, :n].float().cpu().numpy())
+    return outputs
+
+def synthesize_batches(model, items, batch_size, speed=1):
+    """
+    Synthesize (phonemes, ref_s) items in batches of similar phoneme length
+    to keep padding small. Returns waveforms in the original item order.
+    """
+    order = sorted(range(len(items)), key=lambda i: len(items[i][0]))
+    results = [None] * len(items)
+    for start in range(0, len(order), batch_size):
+        group = order[start:start + batch_size]
+        outputs = forward_batch(model, [items[i][0] for i in group], [items[i][1] for i in group], speed)
+        for i, audio in zip(group, outputs):
+            results[i] = audio
+    return results
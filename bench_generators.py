@@ -0,0 +1,71 @@
+# Compare report generation with Ollama and with phrase templates, optionally
+# including synthesis. Uses a built-in sample reading unless --city is given
+# (which needs OPENWEATHER_KEY). Usage: python bench_generators.py --runs 3 --tts
+
+import argparse
+import os
+import statistics
+import time
+from template_report import template_weather_report
+from weather_report import get_weather, ollama_weather_report
+
+SAMPLE_WEATHER = {
+    "dt": 1760540400, "timezone": -10800, "name": "Montevideo", "visibility": 10000,
+    "sys": {"country": "UY", "sunrise": 1760518860, "sunset": 1760565060},
+    "main": {"temp": 17.4, "feels_like": 16.9, "temp_min": 14.2, "temp_max": 19.8, "humidity": 71},
+    "wind": {"speed": 5.7}, "clouds": {"all": 40},
+    "weather": [{"main": "Clouds", "description": "nubes dispersas"}],
+}
+
+def time_generator(generate, weather, runs):
+    """Run generate(weather) `runs` times with distinct observation times; return (seconds per run, last text)."""
+    times = []
+    text = ""
+    for i in range(runs):
+        # Shift dt so cached reports and fixed seeds do not flatter either side
+        reading = dict(weather, dt=weather["dt"] + 60 * i)
+        t0 = time.perf_counter()
+        text = generate(reading)
+        times.append(time.perf_counter() - t0)
+    return times, text
+
+def time_tts(text):
+    """Synthesize text once cold and once warm (G2P and audio caches filled); return both times and audio seconds."""
+    from text_splitter import safe_tts_chunks
+    from tts_registry import warm_up
+    warm_up(voice="ef_dora", text="Hola.")
+    times = []
+    for _ in range(2):
+        t0 = time.perf_counter()
+        audio = safe_tts_chunks(None, None, None, text, "ef_dora")
+        times.append(time.perf_counter() - t0)
+    return times, sum(len(a) for a in audio) / 24000
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM and template report generation.")
+    parser.add_argument("--runs", type=int, default=3, help="reports per generator (default: 3)")
+    parser.add_argument("--city", help="fetch a live reading for this city instead of the sample")
+    parser.add_argument("--skip-llm", action="store_true", help="only time the templates")
+    parser.add_argument("--tts", action="store_true", help="also time synthesis of each generator's report")
+    args = parser.parse_args()
+
+    weather = SAMPLE_WEATHER
+    if args.city:
+        weather = get_weather(os.environ["OPENWEATHER_KEY"], args.city)
+    generators = {"template": template_weather_report}
+    if not args.skip_llm:
+        generators["llm"] = lambda w: ollama_weather_report(w, use_cache=False)
+    for name, generate in generators.items():
+        try:
+            times, text = time_generator(generate, weather, args.runs)
+        except Exception as e:
+            print(f"[ERROR] {name}: {e}")
+            continue
+        print(f"{name:>8}: median {statistics.median(times) * 1000:.2f} ms, max {max(times) * 1000:.2f} ms, "
+              f"{len(text)} chars")
+        if args.tts:
+            (cold, warm), audio_s = time_tts(text)
+            print(f"{'':>8}  TTS {audio_s:.1f}s of audio: {cold:.2f}s cold, {warm:.2f}s with warm caches")
+
+if __name__ == "__main__":
+    main()
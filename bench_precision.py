@@ -0,0 +1,122 @@
+# A/B comparison of inference precisions (see precision.py). Each mode runs in
+# its own process, so peak RSS is per mode. Reports load time, real-time factor,
+# peak RSS, and similarity to the fp32 waveform (SNR, and log-mel distance, which
+# tolerates the small timing shifts lower precision can cause).
+# Usage: python bench_precision.py --runs 3            (fp32, bf16, int8 on CPU)
+#        python bench_precision.py --modes fp32,int8 --text "Hola a todos."
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+SAMPLE_RATE = 24000
+VOICE = "ef_dora"
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1e6 if sys.platform == "darwin" else rss / 1e3
+
+def run_mode(precision, device, text, runs, out_path):
+    """Load the model at precision, synthesize text `runs` times and save the last audio. Returns timings."""
+    from text_splitter import safe_tts_chunks
+    from tts_registry import select_device, warm_up
+    device = device or select_device()
+    t0 = time.perf_counter()
+    model, pipeline, pack = warm_up(device, voice=VOICE, text="Hola.", precision=precision)
+    load_s = time.perf_counter() - t0
+    times = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        audio = np.concatenate(safe_tts_chunks(pipeline, model, pack, text, VOICE))
+        times.append(time.perf_counter() - t0)
+    np.save(out_path, audio)
+    return {"load_s": load_s, "rtf": min(times) / (len(audio) / SAMPLE_RATE), "peak_rss_mb": peak_rss_mb()}
+
+def log_mel(audio, n_fft=1024, hop=256, n_mels=80):
+    """Log-mel spectrogram in dB, (frames, n_mels)."""
+    window = np.hanning(n_fft).astype(np.float32)
+    frames = np.lib.stride_tricks.sliding_window_view(np.pad(audio, (0, n_fft)), n_fft)[::hop]
+    power = np.abs(np.fft.rfft(frames * window, axis=-1)) ** 2
+    mel = lambda f: 2595 * np.log10(1 + f / 700)
+    hz = 700 * (10 ** (np.linspace(mel(0), mel(SAMPLE_RATE / 2), n_mels + 2) / 2595) - 1)
+    bins = np.fft.rfftfreq(n_fft, 1 / SAMPLE_RATE)
+    fbank = np.zeros((n_mels, len(bins)), dtype=np.float32)
+    for m in range(n_mels):
+        lo, mid, hi = hz[m:m + 3]
+        fbank[m] = np.clip(np.minimum((bins - lo) / (mid - lo), (hi - bins) / (hi - mid)), 0, None)
+    return 10 * np.log10(power @ fbank.T + 1e-10)
+
+def compare(reference, audio):
+    """(SNR in dB, mean absolute log-mel difference in dB, length difference in s) of audio against reference."""
+    n = min(len(reference), len(audio))
+    noise = np.sum((reference[:n] - audio[:n]) ** 2)
+    snr = 10 * np.log10(np.sum(reference[:n] ** 2) / noise) if noise else float("inf")
+    mel_ref, mel = log_mel(reference), log_mel(audio)
+    frames = min(len(mel_ref), len(mel))
+    mel_dist = float(np.mean(np.abs(mel_ref[:frames] - mel[:frames])))
+    return snr, mel_dist, (len(audio) - len(reference)) / SAMPLE_RATE
+
+def default_text():
+    from bench_generators import SAMPLE_WEATHER
+    from template_report import template_weather_report
+    return template_weather_report(SAMPLE_WEATHER)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Kokoro inference precisions against fp32.")
+    parser.add_argument("--modes", help="comma-separated precisions (default: fp32,bf16,int8 on CPU, "
+                                        "fp32,bf16,fp16 otherwise)")
+    parser.add_argument("--device", help="device (default: best available)")
+    parser.add_argument("--runs", type=int, default=3, help="timed syntheses per mode, best is kept (default: 3)")
+    parser.add_argument("--text", help="text to synthesize (default: a template weather report)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    text = args.text or default_text()
+
+    if args.worker:
+        print(json.dumps(run_mode(args.worker, args.device, text, args.runs, args.out)))
+        return
+
+    device = args.device
+    if args.modes:
+        modes = args.modes.split(",")
+    else:
+        from tts_registry import select_device
+        device = device or select_device()
+        modes = ["fp32", "bf16", "int8"] if device == "cpu" else ["fp32", "bf16", "fp16"]
+    if modes[0] != "fp32":
+        modes.insert(0, "fp32")
+    # Fresh synthesis in every mode: no audio cache
+    env = {k: v for k, v in os.environ.items() if k != "KOKORO_AUDIO_CACHE"}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in modes:
+            out = os.path.join(tmp, f"{mode}.npy")
+            cmd = [sys.executable, os.path.abspath(__file__), "--worker", mode, "--out", out,
+                   "--runs", str(args.runs), "--text", text]
+            if device:
+                cmd += ["--device", device]
+            proc = subprocess.run(cmd, capture_output=True, text=True, env=env)
+            if proc.returncode:
+                print(f"[ERROR] {mode}: {proc.stderr.strip().splitlines()[-1]}")
+                continue
+            results[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+            results[mode]["audio"] = np.load(out)
+    if "fp32" not in results:
+        return
+    reference = results["fp32"]["audio"]
+    print(f"{len(reference) / SAMPLE_RATE:.1f}s of audio, best of {args.runs} runs")
+    print(f"{'mode':>5} {'load s':>7} {'RTF':>6} {'peak RSS MB':>12} {'SNR dB':>7} {'mel dB':>7} {'len diff s':>10}")
+    for mode, r in results.items():
+        snr, mel_dist, len_diff = compare(reference, r["audio"])
+        print(f"{mode:>5} {r['load_s']:7.2f} {r['rtf']:6.3f} {r['peak_rss_mb']:12.0f} {snr:7.1f} {mel_dist:7.2f} {len_diff:10.2f}")
+
+if __name__ == "__main__":
+    main()
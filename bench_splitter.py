@@ -0,0 +1,81 @@
+# Benchmark split_text_for_tts on multi-megabyte inputs and check the phoneme
+# estimator against real G2P. Usage: python bench_splitter.py --mb 4 --g2p 200
+
+import argparse
+import random
+import time
+from text_splitter import MAX_PHONEMES, DEFAULT_PHONEME_BUDGET, estimate_phonemes, split_text_for_tts
+
+SAMPLE_SENTENCES = [
+    "Hola, mi nombre es Dora.",
+    "La temperatura actual es de 18 punto 5 grados Celsius.",
+    "Humedad: 72 por ciento.",
+    "Se esperan vientos del sureste de 25 kilómetros por hora durante la tarde.",
+    "¿Necesitás paraguas hoy?",
+    "La inteligencia artificial ha avanzado mucho en los últimos años, y ahora los sistemas de texto a voz pueden generar discursos completos.",
+    "Gracias por escuchar el informe del tiempo.",
+]
+
+# Tables and readings: mostly digits and whitespace, which estimate very differently from words
+DIGIT_SENTENCES = [
+    "Temperaturas: 18 20 21 19 17 16 15 14 13 12 11 10 9 8 7 6 5 4.",
+    "Lecturas 1013 1012 1011 1010 1009 1008 1007 1006 1005   1004   1003   1002.",
+    "Humedad 72, 75, 78, 80, 83, 85, 88, 90, 91, 93, 95, 96, 97, 98, 99.",
+    "Viento 5 10 15 20 25 30 35 40 45 50 55 60 65 70 75 80 85 90 95 100 105 110.",
+]
+
+def make_text(n_bytes, seed=0, sentences=SAMPLE_SENTENCES):
+    """Build roughly n_bytes of Spanish-like text from sample sentences, with paragraphs."""
+    rng = random.Random(seed)
+    parts = []
+    size = 0
+    while size < n_bytes:
+        sentence = rng.choice(sentences)
+        if rng.random() < 0.02:
+            # An occasional run-on sentence with no terminal punctuation for a while
+            sentence = " y ".join(rng.choice(sentences).rstrip(".") for _ in range(12)) + "."
+        parts.append(sentence)
+        parts.append("\n\n" if rng.random() < 0.1 else " ")
+        size += len(sentence) + 1
+    return "".join(parts)
+
+def check_g2p(chunks, lang, n):
+    """Phonemize n sampled chunks with Kokoro's G2P and compare their length with the estimates."""
+    from kokoro import KPipeline
+    pipeline = KPipeline(lang_code=lang, model=False)
+    sample = random.Random(1).sample(chunks, min(n, len(chunks)))
+    over = 0
+    ratios = []
+    for chunk in sample:
+        ps = pipeline.g2p(chunk)[0] or ""
+        ratios.append(len(ps) / max(1, estimate_phonemes(chunk, lang)))
+        if len(ps) > MAX_PHONEMES:
+            over += 1
+    ratios.sort()
+    print(f"Actual/estimated phonemes: median {ratios[len(ratios) // 2]:.2f}, max {ratios[-1]:.2f}")
+    print(f"Chunks over the {MAX_PHONEMES}-phoneme model limit (retries): {over}/{len(sample)} ({over / len(sample):.1%})")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark split_text_for_tts on large inputs.")
+    parser.add_argument("--mb", type=float, default=4, help="input size in megabytes (default: 4)")
+    parser.add_argument("--budget", type=int, default=DEFAULT_PHONEME_BUDGET, help="max estimated phonemes per chunk")
+    parser.add_argument("--g2p", type=int, default=0, help="phonemize this many sampled chunks with Kokoro's G2P")
+    parser.add_argument("--lang", default="e", help="Kokoro lang_code (default: e)")
+    args = parser.parse_args()
+
+    for name, sentences in (("mixed", SAMPLE_SENTENCES), ("digit-heavy", DIGIT_SENTENCES)):
+        text = make_text(int(args.mb * 1024 * 1024), sentences=sentences)
+        t0 = time.time()
+        chunks = split_text_for_tts(text, lang_code=args.lang, max_phonemes=args.budget)
+        elapsed = time.time() - t0
+        mb = len(text.encode("utf-8")) / 1024 / 1024
+        estimates = [estimate_phonemes(c, args.lang) for c in chunks]
+        over = sum(e > args.budget for e in estimates)
+        print(f"[TIME] {name}: split {mb:.1f} MB in {elapsed:.2f}s ({mb / elapsed:.1f} MB/s), {len(chunks)} chunks")
+        print(f"Estimated phonemes per chunk: mean {sum(estimates) / len(estimates):.0f}, max {max(estimates)}, "
+              f"{over} over the {args.budget} budget")
+        if args.g2p:
+            check_g2p(chunks, args.lang, args.g2p)
+
+if __name__ == "__main__":
+    main()
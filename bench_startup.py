@@ -0,0 +1,72 @@
+# Cold-start time of the paths that do not synthesize (importing weather_report,
+# --help), measured in fresh interpreters with -X importtime. Fails if the median
+# import time is over the budget or a TTS dependency gets imported.
+# Usage: python bench_startup.py --runs 5 --budget-ms 300
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules that only synthesis should load
+HEAVY = ("torch", "kokoro", "numpy", "soundfile", "psutil", "misaki")
+
+def import_times(module):
+    """
+    Import module in a fresh interpreter with -X importtime. Returns
+    ({imported module: cumulative microseconds}, total microseconds, HEAVY modules loaded).
+    """
+    check = f"import sys, {module}; print(','.join(m for m in {HEAVY!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", check],
+                          capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return times, times.get(module, 0), heavy
+
+def wall_time(args):
+    """Seconds for a fresh interpreter to run args."""
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable] + args, capture_output=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    return time.perf_counter() - t0
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure weather_report startup time.")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per measurement (default: 5)")
+    parser.add_argument("--module", default="weather_report", help="module to import (default: weather_report)")
+    parser.add_argument("--budget-ms", type=float, default=300,
+                        help="fail if the median import takes longer (default: 300)")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list (default: 10)")
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(args.runs):
+        times, total, heavy = import_times(args.module)
+        totals.append(total / 1000)
+    baseline = wall_time(["-c", "pass"])
+    help_times = [wall_time([f"{args.module}.py", "--help"]) - baseline for _ in range(args.runs)]
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f} ms, max {max(totals):.0f} ms ({args.runs} runs)")
+    print(f"{args.module}.py --help: median {statistics.median(help_times) * 1000:.0f} ms over a bare interpreter")
+    print("Slowest imports (cumulative, last run):")
+    for name, us in sorted(times.items(), key=lambda kv: -kv[1])[:args.top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+    failed = False
+    if heavy:
+        print(f"[ERROR] TTS dependencies imported at startup: {', '.join(heavy)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"[ERROR] Import time {median:.0f} ms is over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+# Weather bulletins for many cities in one run. Weather requests and Ollama
+# generations run concurrently in a bounded thread pool, and each report is
+# synthesized by one shared, warm Kokoro model as soon as its text is ready.
+# Usage: python bulk_report.py --city Montevideo,UY --city Salto,UY
+#        python bulk_report.py --cities-file cities.txt --out-dir bulletins
+#        python bulk_report.py --id 3441575 --id 3440639   (OpenWeatherMap city IDs)
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from audio_sink import SAMPLE_RATE, WavSink
+from http_client import get_session
+from template_report import template_weather_report
+from text_splitter import iter_tts_chunks
+from tts_registry import get_tts, warm_up
+from weather_report import get_weather, ollama_weather_report, report_path
+
+GROUP_URL = "https://api.openweathermap.org/data/2.5/group"
+# The group endpoint accepts at most this many city IDs per request
+GROUP_MAX_IDS = 20
+VOICE = "ef_dora"
+
+def get_weather_group(api_key, city_ids, units="metric", lang="es"):
+    """
+    Fetch current weather for many OpenWeatherMap city IDs with the group endpoint,
+    GROUP_MAX_IDS per request. Returns one weather JSON (or None if missing) per ID.
+    """
+    found = {}
+    for start in range(0, len(city_ids), GROUP_MAX_IDS):
+        ids = ",".join(str(i) for i in city_ids[start:start + GROUP_MAX_IDS])
+        resp = get_session().get(GROUP_URL, params={"id": ids, "appid": api_key, "units": units, "lang": lang})
+        resp.raise_for_status()
+        for item in resp.json()["list"]:
+            # Group entries carry the UTC offset in sys instead of at the top level
+            item.setdefault("timezone", item["sys"].get("timezone", 0))
+            found[str(item["id"])] = item
+    return [found.get(str(i)) for i in city_ids]
+
+def synthesize_report(text, out_path, batch_size=1):
+    """Synthesize text into a WAV file with the shared model. Returns seconds of audio."""
+    model, pipeline, pack = get_tts(voice=VOICE)
+    samples = 0
+    sink = WavSink(out_path)
+    try:
+        for audio in iter_tts_chunks(pipeline, model, pack, text, VOICE, batch_size=batch_size):
+            sink.write(audio)
+            samples += len(audio)
+    finally:
+        sink.close()
+    if samples == 0:
+        os.remove(out_path)
+    return samples / SAMPLE_RATE
+
+def run_bulk(api_key, cities=(), city_ids=(), out_dir=".", workers=8, llm_workers=2, batch_size=1,
+             generator="llm"):
+    """
+    Produce a bulletin per city name and per city ID. Up to `workers` cities are
+    fetched and written at once, with at most llm_workers Ollama generations in
+    flight (match OLLAMA_NUM_PARALLEL). generator="template" writes the reports
+    with template_report instead of Ollama. Returns {city: wav path or exception}.
+    """
+    timings = {"fetch": 0.0, "report": 0.0, "tts": 0.0, "audio": 0.0}
+    lock = threading.Lock()
+    llm_slots = threading.Semaphore(llm_workers)
+
+    def timed(stage, fn, *args):
+        t = time.time()
+        try:
+            return fn(*args)
+        finally:
+            with lock:
+                timings[stage] += time.time() - t
+
+    def prepare(city, weather=None):
+        if weather is None:
+            weather = timed("fetch", get_weather, api_key, city)
+        if generator == "template":
+            return timed("report", template_weather_report, weather)
+        with llm_slots:
+            return timed("report", ollama_weather_report, weather)
+
+    os.makedirs(out_dir, exist_ok=True)
+    # Results are keyed by city, so each city is written once
+    cities = list(dict.fromkeys(cities))
+    city_ids = list(dict.fromkeys(city_ids))
+    results = {}
+    t0 = time.time()
+    with ThreadPoolExecutor(workers) as pool:
+        futures = {pool.submit(prepare, city): city for city in cities}
+        if city_ids:
+            for city_id, weather in zip(city_ids, timed("fetch", get_weather_group, api_key, city_ids)):
+                if weather is None:
+                    results[str(city_id)] = LookupError(f"no weather returned for city ID {city_id}")
+                    continue
+                city = f"{weather['name']},{weather['sys'].get('country', '')}"
+                if city in futures.values():
+                    continue
+                futures[pool.submit(prepare, city, weather)] = city
+        # Load the model while the first requests are in flight
+        t_load = time.time()
+        warm_up(voice=VOICE, text="Hola.")
+        load_time = time.time() - t_load
+        for future in as_completed(futures):
+            city = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                print(f"[ERROR] {city}: {e}")
+                results[city] = e
+                continue
+            path = os.path.join(out_dir, report_path(city))
+            try:
+                seconds = timed("tts", synthesize_report, report, path, batch_size)
+            except Exception as e:
+                print(f"[ERROR] {city}: speech synthesis failed: {e}")
+                results[city] = e
+                continue
+            timings["audio"] += seconds
+            results[city] = path if seconds else None
+            print(f"[INFO] {city}: {seconds:.1f}s of audio -> {path}")
+    elapsed = time.time() - t0
+    failed = sum(isinstance(r, Exception) for r in results.values())
+    done = len(results) - failed
+    print(f"[TIME] {done} reports ({failed} failed) in {elapsed:.1f}s: {done * 60 / elapsed:.1f} reports/min, "
+          f"model load {load_time:.1f}s")
+    print(f"Busy time: fetch {timings['fetch']:.1f}s, report writing {timings['report']:.1f}s, TTS {timings['tts']:.1f}s; "
+          f"{timings['audio']:.1f}s of audio (RTF {timings['tts'] / max(timings['audio'], 1e-9):.2f})")
+    return results
+
+def read_cities(path):
+    """City queries from a text file, one per line; blank lines and # comments are skipped."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Spanish weather bulletins for many cities in one run.")
+    parser.add_argument("--city", action="append", default=[], help="OpenWeatherMap city query, repeatable")
+    parser.add_argument("--cities-file", help="file with one city query per line")
+    parser.add_argument("--id", action="append", type=int, default=[],
+                        help="OpenWeatherMap city ID, repeatable (fetched with the group endpoint)")
+    parser.add_argument("--out-dir", default=".", help="directory for the WAV files (default: .)")
+    parser.add_argument("--workers", type=int, default=8, help="cities fetched and written at once (default: 8)")
+    parser.add_argument("--llm-workers", type=int, default=2,
+                        help="concurrent Ollama generations (default: 2, see OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--batch-size", type=int, default=1, help="chunks per model forward pass (default: 1)")
+    parser.add_argument("--generator", choices=("llm", "template"), default="llm",
+                        help="write the reports with Ollama (default) or with fast phrase templates")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    api_key = os.environ.get("OPENWEATHER_KEY")
+    if not api_key:
+        raise RuntimeError("OPENWEATHER_KEY environment variable not set.")
+    cities = args.city + (read_cities(args.cities_file) if args.cities_file else [])
+    if not cities and not args.id:
+        raise SystemExit("Give at least one --city, --cities-file or --id.")
+    run_bulk(api_key, cities, args.id, args.out_dir, args.workers, args.llm_workers, args.batch_size,
+             args.generator)
+
+if __name__ == "__main__":
+    main()
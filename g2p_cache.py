@@ -0,0 +1,87 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+class G2PCache:
+    """
+    LRU cache of text chunk -> phoneme string, keyed per lang_code.
+    If path is given, entries are also stored in an sqlite file so they survive restarts;
+    the in-memory LRU stays bounded by maxsize either way.
+    """
+    def __init__(self, maxsize=4096, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS phonemes (lang TEXT, text TEXT, ps TEXT, PRIMARY KEY (lang, text))"
+            )
+            self._db.commit()
+
+    def get(self, lang_code, text):
+        """Return cached phonemes or None."""
+        key = (lang_code, text)
+        with self._lock:
+            ps = self._entries.get(key)
+            if ps is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return ps
+            if self._db is not None:
+                row = self._db.execute("SELECT ps FROM phonemes WHERE lang=? AND text=?", key).fetchone()
+                if row is not None:
+                    self._remember(key, row[0])
+                    self.disk_hits += 1
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, lang_code, text, ps):
+        key = (lang_code, text)
+        with self._lock:
+            self._remember(key, ps)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO phonemes VALUES (?, ?, ?)", (lang_code, text, ps))
+                self._db.commit()
+
+    def _remember(self, key, ps):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = ps
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses, "size": len(self._entries)}
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_g2p_cache():
+    """
+    Process-wide G2P cache. KOKORO_G2P_CACHE names an sqlite file to persist it and
+    KOKORO_G2P_CACHE_SIZE bounds the in-memory LRU (default 4096 chunks, 0 disables it).
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = G2PCache(
+                maxsize=int(os.environ.get("KOKORO_G2P_CACHE_SIZE", 4096)),
+                path=os.environ.get("KOKORO_G2P_CACHE") or None,
+            )
+        return _default_cache
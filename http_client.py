@@ -0,0 +1,60 @@
+import os
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeouts in seconds per host. Ollama's read timeout covers a
+# whole non-streamed generation, or the gap between streamed tokens.
+TIMEOUTS = {
+    "api.openweathermap.org": (5, 15),
+    "localhost": (2, 60),
+    "127.0.0.1": (2, 60),
+}
+DEFAULT_TIMEOUT = (5, 30)
+
+# Statuses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def timeout_for(url):
+    """(connect, read) timeout for a URL's host."""
+    return TIMEOUTS.get(urlsplit(url).hostname, DEFAULT_TIMEOUT)
+
+class PooledSession(requests.Session):
+    """requests.Session that applies the per-host timeout when a call does not pass one."""
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", timeout_for(url))
+        return super().request(method, url, **kwargs)
+
+def make_session(pool_connections=4, pool_maxsize=16, retries=3, backoff=0.5):
+    """
+    Session with keep-alive connection pools (pool_connections hosts, pool_maxsize
+    connections each) and exponential backoff. Connection errors are retried for
+    every method; read errors and RETRY_STATUSES only for idempotent ones, so an
+    Ollama generation (POST) is never sent twice.
+    """
+    retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+                  respect_retry_after_header=True, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = PooledSession()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+_default_session = None
+_default_lock = threading.Lock()
+
+def get_session():
+    """
+    Process-wide session shared by all weather and Ollama calls. HTTP_POOL_SIZE sets
+    the connections kept per host (default 16) and HTTP_RETRIES the retry count (default 3).
+    """
+    global _default_session
+    with _default_lock:
+        if _default_session is None:
+            _default_session = make_session(
+                pool_maxsize=int(os.environ.get("HTTP_POOL_SIZE", 16)),
+                retries=int(os.environ.get("HTTP_RETRIES", 3)),
+            )
+        return _default_session
@@ -0,0 +1,241 @@
+# Pre-rendered audio for the fixed wording of template bulletins and for number
+# words, spliced together with short crossfades so only truly novel text (city
+# names, weather descriptions) is synthesized per bulletin.
+# Usage: python phrase_bank.py --dir phrase_bank   (renders every template phrase and 0-100)
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import numpy as np
+from audio_cache import registry_model_version
+from audio_sink import SAMPLE_RATE
+from text_splitter import safe_tts_chunks
+from tts_registry import get_tts
+
+CROSSFADE = SAMPLE_RATE * 10 // 1000      # 10 ms
+SENTENCE_PAUSE = SAMPLE_RATE * 300 // 1000
+CLAUSE_PAUSE = SAMPLE_RATE * 150 // 1000
+WORD_GAP = SAMPLE_RATE * 40 // 1000
+
+_NUMBER = re.compile(r'-?\d+')
+
+UNITS = ["cero", "uno", "dos", "tres", "cuatro", "cinco", "seis", "siete", "ocho", "nueve",
+         "diez", "once", "doce", "trece", "catorce", "quince", "dieciséis", "diecisiete", "dieciocho",
+         "diecinueve", "veinte", "veintiuno", "veintidós", "veintitrés", "veinticuatro", "veinticinco",
+         "veintiséis", "veintisiete", "veintiocho", "veintinueve"]
+TENS = ["", "", "", "treinta", "cuarenta", "cincuenta", "sesenta", "setenta", "ochenta", "noventa"]
+HUNDREDS = ["", "ciento", "doscientos", "trescientos", "cuatrocientos", "quinientos", "seiscientos",
+            "setecientos", "ochocientos", "novecientos"]
+
+def number_words(n):
+    """Spanish words for an integer, e.g. 41 -> 'cuarenta y uno'."""
+    if n < 0:
+        return "menos " + number_words(-n)
+    if n < 30:
+        return UNITS[n]
+    if n < 100:
+        tens, units = divmod(n, 10)
+        return TENS[tens] + (f" y {UNITS[units]}" if units else "")
+    if n == 100:
+        return "cien"
+    if n < 1000:
+        hundreds, rest = divmod(n, 100)
+        return HUNDREDS[hundreds] + (" " + number_words(rest) if rest else "")
+    thousands, rest = divmod(n, 1000)
+    head = "mil" if thousands == 1 else number_words(thousands) + " mil"
+    return head + (" " + number_words(rest) if rest else "")
+
+def spoken_value(text):
+    """
+    Split a filled-in value into (words, is_number) pieces: number words and the
+    text between them. A fraction after "punto" keeps its leading zeros
+    ("3 punto 05" -> tres, punto, cero, cinco); other numbers, such as clock
+    minutes ("7 y 05" -> siete, y, cinco), are read as whole numbers. A minus
+    sign is its own "menos" piece, so "-0 punto 5" keeps its sign.
+    """
+    pieces = []
+    pos = 0
+    for m in _NUMBER.finditer(text):
+        between = text[pos:m.start()].strip()
+        if between:
+            pieces.append((between, False))
+        digits = m.group()
+        if digits.startswith("-"):
+            pieces.append(("menos", True))
+            digits = digits[1:]
+        if between.endswith("punto"):
+            significant = digits.lstrip("0")
+            pieces += [("cero", True)] * (len(digits) - len(significant))
+            if significant:
+                pieces.append((number_words(int(significant)), True))
+        else:
+            pieces.append((number_words(int(digits)), True))
+        pos = m.end()
+    rest = text[pos:].strip()
+    if rest:
+        pieces.append((rest, False))
+    return pieces
+
+def trim_silence(audio, threshold=0.02, margin=SAMPLE_RATE * 5 // 1000):
+    """Cut leading and trailing samples quieter than threshold times the peak, keeping a small margin."""
+    audio = np.asarray(audio, dtype=np.float32)
+    peak = float(np.abs(audio).max()) if len(audio) else 0.0
+    if peak == 0.0:
+        return audio[:0]
+    loud = np.flatnonzero(np.abs(audio) > threshold * peak)
+    return audio[max(0, loud[0] - margin):loud[-1] + 1 + margin]
+
+def splice(pieces, crossfade=CROSSFADE):
+    """Join audio pieces end to end, blending each boundary with a linear crossfade."""
+    pieces = [p for p in pieces if len(p)]
+    out = np.zeros(sum(len(p) for p in pieces), dtype=np.float32)
+    end = 0
+    for piece in pieces:
+        n = min(crossfade, len(piece), end)
+        start = end - n
+        if n:
+            ramp = np.linspace(0, 1, n, endpoint=False, dtype=np.float32)
+            out[start:end] = out[start:end] * (1 - ramp) + piece[:n] * ramp
+        out[end:start + len(piece)] = piece[n:]
+        end = start + len(piece)
+    return out[:end]
+
+class PhraseBank:
+    """
+    Directory of pre-synthesized phrases for one voice, stored as raw float32 PCM
+    files that are memory-mapped on lookup, plus an index.json mapping each phrase
+    to its file. Phrases rendered by another model version are re-rendered.
+    """
+    def __init__(self, root, voice="ef_dora", device=None, precision=None):
+        self.root = root
+        self.voice = voice
+        self.device = device
+        self.precision = precision
+        self.rendered = 0
+        self.novel = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._index_path = os.path.join(root, "index.json")
+        self._tts = None
+        self._index = None
+
+    def _load_index(self):
+        """Read index.json, dropping its phrases if they were rendered by another model or voice."""
+        if self._index is None:
+            version = registry_model_version(self.precision)
+            index = {"voice": self.voice, "model": version, "phrases": {}}
+            if os.path.exists(self._index_path):
+                with open(self._index_path, encoding="utf-8") as f:
+                    index = json.load(f)
+            if index["model"] != version or index["voice"] != self.voice:
+                if index["phrases"]:
+                    print(f"[INFO] Phrase bank {self.root} was rendered with another model or voice; re-rendering")
+                index = {"voice": self.voice, "model": version, "phrases": {}}
+            self._index = index
+        return self._index
+
+    def _get_tts(self):
+        if self._tts is None:
+            self._tts = get_tts(self.device, voice=self.voice, precision=self.precision)
+        return self._tts
+
+    def synthesize(self, text):
+        """Synthesize text with safe_tts_chunks, trimmed of edge silence (not stored in the bank)."""
+        model, pipeline, pack = self._get_tts()
+        chunks = safe_tts_chunks(pipeline, model, pack, text, self.voice)
+        return trim_silence(np.concatenate(chunks)) if chunks else np.zeros(0, dtype=np.float32)
+
+    def get(self, phrase, render=True):
+        """Memory-mapped audio of a phrase, rendering and storing it first if needed (None if render=False)."""
+        with self._lock:
+            # The model is only loaded to render a missing phrase
+            entry = self._load_index()["phrases"].get(phrase)
+            if entry is None:
+                if not render:
+                    return None
+                audio = self.synthesize(phrase)
+                entry = {"file": hashlib.sha256(phrase.encode("utf-8")).hexdigest()[:24] + ".pcm",
+                         "samples": len(audio)}
+                audio.astype("<f4").tofile(os.path.join(self.root, entry["file"]))
+                self._index["phrases"][phrase] = entry
+                self.rendered += 1
+        if entry["samples"] == 0:
+            return np.zeros(0, dtype=np.float32)
+        return np.memmap(os.path.join(self.root, entry["file"]), dtype="<f4", mode="r", shape=(entry["samples"],))
+
+    def build(self, phrases):
+        """Render every phrase that is not in the bank yet and save the index."""
+        for phrase in phrases:
+            self.get(phrase)
+        self.save()
+
+    def save(self):
+        with self._lock:
+            tmp = f"{self._index_path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._load_index(), f, ensure_ascii=False, indent=1)
+            os.replace(tmp, self._index_path)
+
+    def _fixed(self, text):
+        """Audio pieces for fixed template wording: a bank phrase, or a pause for bare punctuation."""
+        phrase = text.strip()
+        if not any(c.isalnum() for c in phrase):
+            if any(c in ".!?" for c in phrase):
+                return [np.zeros(SENTENCE_PAUSE, dtype=np.float32)]
+            if any(c in ",;:" for c in phrase):
+                return [np.zeros(CLAUSE_PAUSE, dtype=np.float32)]
+            return []
+        pieces = [self.get(phrase)]
+        if phrase[-1] in ".!?":
+            pieces.append(np.zeros(SENTENCE_PAUSE, dtype=np.float32))
+        return pieces
+
+    def _value(self, text):
+        """Audio pieces for a filled-in value: numbers as bank number words, other text as is."""
+        pieces = []
+        for words, is_number in spoken_value(text):
+            if is_number:
+                audio = self.get(words)
+            else:
+                # Short connecting words ("punto", "y") are in the bank; anything else is novel
+                audio = self.get(words, render=False)
+                if audio is None:
+                    audio = self.synthesize(words)
+                    self.novel += 1
+            pieces += [np.zeros(WORD_GAP, dtype=np.float32), audio]
+        return pieces + [np.zeros(WORD_GAP, dtype=np.float32)]
+
+    def assemble(self, segments):
+        """
+        Audio for (text, fixed) segments such as template_weather_segments returns:
+        fixed wording and numbers come from the bank, other values are synthesized.
+        """
+        pieces = []
+        for text, fixed in segments:
+            pieces += self._fixed(text) if fixed else self._value(text)
+        if self.rendered:
+            self.save()
+        return splice(pieces)
+
+def default_phrases(max_number=100):
+    """Template wording, connecting words and the number words 0..max_number."""
+    from template_report import template_phrases
+    return template_phrases() + ["menos", "punto", "y", "en punto"] + [number_words(n) for n in range(max_number + 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render the template phrase bank.")
+    parser.add_argument("--dir", default="phrase_bank", help="bank directory (default: phrase_bank)")
+    parser.add_argument("--voice", default="ef_dora", help="Kokoro voice (default: ef_dora)")
+    parser.add_argument("--max-number", type=int, default=100, help="render number words up to N (default: 100)")
+    args = parser.parse_args()
+    bank = PhraseBank(args.dir, args.voice)
+    t0 = time.time()
+    bank.build(default_phrases(args.max_number))
+    print(f"[TIME] Rendered {bank.rendered} new phrases into {args.dir} in {time.time() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
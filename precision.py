@@ -0,0 +1,70 @@
+import os
+from contextlib import nullcontext
+import torch
+from torch import nn
+
+# Inference precisions for KModel. bf16 and fp16 keep the fp32 weights and run
+# under torch.autocast; int8 replaces the Linear and LSTM layers with dynamically
+# quantized ones (CPU only). Compare them with bench_precision.py.
+PRECISIONS = ("fp32", "bf16", "fp16", "int8")
+_AUTOCAST = {"bf16": torch.bfloat16, "fp16": torch.float16}
+
+def default_precision():
+    """Precision from KOKORO_PRECISION (default fp32)."""
+    return os.environ.get("KOKORO_PRECISION") or "fp32"
+
+def check_precision(precision, device):
+    """Raise ValueError if precision is unknown or cannot run on device."""
+    device = str(device).split(":")[0]
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+    if precision == "int8" and device != "cpu":
+        raise ValueError("int8 dynamic quantization only runs on CPU")
+    if precision == "fp16" and device == "cpu":
+        raise ValueError("fp16 autocast needs CUDA or MPS; use bf16 or int8 on CPU")
+    if precision == "bf16" and device == "cuda" and not torch.cuda.is_bf16_supported():
+        raise ValueError("this GPU does not support bf16")
+
+def _fp32_stft(model):
+    """
+    Keep the decoder's STFT and inverse STFT in float32 under autocast: complex
+    bf16/fp16 is not supported on every device, and the waveform needs the range.
+    """
+    from kokoro.custom_stft import CustomSTFT
+    from kokoro.istftnet import TorchSTFT
+
+    def fp32(fn):
+        def run(*args):
+            with torch.autocast(device_type=model.device.type, enabled=False):
+                return fn(*(a.float() for a in args))
+        return run
+
+    for module in model.modules():
+        if isinstance(module, (TorchSTFT, CustomSTFT)):
+            module.transform = fp32(module.transform)
+            module.inverse = fp32(module.inverse)
+
+def apply_precision(model, precision):
+    """
+    Prepare a freshly loaded fp32 KModel for inference at precision (in place)
+    and record it as model.precision. Returns the model.
+    """
+    check_precision(precision, model.device)
+    if precision == "int8":
+        # In place: deepcopy, the default, fails on the decoder's weight_norm layers
+        torch.ao.quantization.quantize_dynamic(model, {nn.Linear, nn.LSTM}, dtype=torch.qint8, inplace=True)
+        for module in model.modules():
+            # kokoro calls this cuDNN-only method on its LSTMs; quantized LSTMs lack it
+            if isinstance(module, torch.ao.nn.quantized.dynamic.LSTM):
+                module.flatten_parameters = lambda: None
+    elif precision in _AUTOCAST:
+        _fp32_stft(model)
+    model.precision = precision
+    return model
+
+def autocast(model):
+    """Autocast context for a forward pass of model at its precision (a no-op for fp32 and int8)."""
+    dtype = _AUTOCAST.get(getattr(model, "precision", "fp32"))
+    if dtype is None:
+        return nullcontext()
+    return torch.autocast(device_type=model.device.type, dtype=dtype)
@@ -0,0 +1,106 @@
+import copy
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+class ReportCache:
+    """
+    Cache of generated reports keyed by a hash of (LLM model, prompt), so an
+    unchanged prompt skips the LLM call. Entries expire ttl seconds after they
+    were generated. If path is given they are also kept in an sqlite file; the
+    in-memory LRU is bounded by maxsize either way.
+    """
+    def __init__(self, ttl=3600, path=None, maxsize=256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS reports (key TEXT PRIMARY KEY, report TEXT, created REAL)")
+            self._db.commit()
+
+    @staticmethod
+    def key(model, prompt):
+        return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Return the cached report if it is younger than ttl, else None."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._db is not None:
+                entry = self._db.execute("SELECT report, created FROM reports WHERE key=?", (key,)).fetchone()
+            if entry is not None and now - entry[1] < self.ttl:
+                self._remember(key, entry)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, report):
+        entry = (report, time.time())
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO reports VALUES (?, ?, ?)", (key,) + entry)
+                self._db.execute("DELETE FROM reports WHERE created < ?", (entry[1] - self.ttl,))
+                self._db.commit()
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+def quantize_weather(weather_json, temp_step=1.0, wind_step=1.0, percent_step=5, time_step=600):
+    """
+    Copy of an OpenWeatherMap response with values rounded so that small changes
+    give the same prompt (and report cache entry): temperatures and wind to whole
+    steps, humidity and clouds to percent_step, visibility to the kilometre, the
+    observation time to time_step seconds and sunrise/sunset to the minute.
+    """
+    def step(value, size):
+        return round(value / size) * size
+
+    weather = copy.deepcopy(weather_json)
+    main = weather['main']
+    for field in ('temp', 'feels_like', 'temp_min', 'temp_max'):
+        main[field] = step(main[field], temp_step)
+    main['humidity'] = step(main['humidity'], percent_step)
+    weather['wind']['speed'] = step(weather['wind']['speed'], wind_step)
+    weather['clouds']['all'] = step(weather['clouds']['all'], percent_step)
+    if weather.get('visibility') is not None:
+        weather['visibility'] = step(weather['visibility'], 1000)
+    weather['dt'] = step(weather['dt'], time_step)
+    for field in ('sunrise', 'sunset'):
+        weather['sys'][field] = step(weather['sys'][field], 60)
+    return weather
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_report_cache():
+    """
+    Process-wide report cache. REPORT_CACHE names an sqlite file to keep reports
+    across runs and REPORT_CACHE_TTL sets their lifetime in seconds (default 3600).
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ReportCache(
+                ttl=float(os.environ.get("REPORT_CACHE_TTL", 3600)),
+                path=os.environ.get("REPORT_CACHE") or None,
+            )
+        return _default_cache
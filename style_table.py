@@ -0,0 +1,24 @@
+import torch
+
+class StyleTable:
+    """
+    A voice pack kept on the model's device as one (N, 1, 256) tensor. Indexing
+    returns a (1, 256) view that is already on the device, so KModel.forward's
+    ref_s.to(device) is a no-op instead of a small host-to-device copy per chunk,
+    and gather() picks the styles of a whole batch in one index_select.
+    On CPU a float32 pack (e.g. a memory-mapped one) is used without copying.
+    """
+    def __init__(self, pack, device):
+        self.table = pack.to(device=device, dtype=torch.float32).reshape(len(pack), 1, -1)
+        self.device = self.table.device
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, idx):
+        return self.table[idx]
+
+    def gather(self, lengths):
+        """(B, 256) reference styles for phoneme sequences of the given lengths (index len - 1, clamped)."""
+        idx = torch.tensor(lengths, dtype=torch.long).sub_(1).clamp_(0, len(self.table) - 1)
+        return self.table[:, 0].index_select(0, idx.to(self.device))
@@ -0,0 +1,95 @@
+import atexit
+import multiprocessing
+import os
+import threading
+from text_splitter import split_text_for_tts
+
+# State of the current worker process, set up once by _init_worker
+_worker = {}
+
+def _init_worker(device, voice, threads, precision):
+    import torch
+    from tts_registry import get_tts
+    torch.set_num_threads(threads)
+    _worker["tts"] = get_tts(device, voice=voice, precision=precision)
+    _worker["voice"] = voice
+
+def _counters():
+    """This process's re-split counts (SPLIT_STATS) and G2P and audio cache hit counts."""
+    from audio_cache import get_audio_cache
+    from g2p_cache import get_g2p_cache
+    from text_splitter import SPLIT_STATS
+    g2p = get_g2p_cache().stats()
+    counters = dict(SPLIT_STATS, g2p_hits=g2p["hits"], g2p_disk_hits=g2p["disk_hits"], g2p_misses=g2p["misses"],
+                    audio_hits=0, audio_misses=0)
+    audio_cache = get_audio_cache()
+    if audio_cache is not None:
+        ac = audio_cache.stats()
+        counters.update(audio_hits=ac["hits"], audio_misses=ac["misses"])
+    return counters
+
+def _synthesize(chunk):
+    """Audio pieces of one chunk, and how much the worker's counters moved while making them."""
+    from audio_cache import get_audio_cache
+    from text_splitter import synthesize_cached_chunk
+    model, pipeline, pack = _worker["tts"]
+    before = _counters()
+    pieces = list(synthesize_cached_chunk(pipeline, model, pack, chunk, _worker["voice"], get_audio_cache()))
+    return pieces, {k: v - before[k] for k, v in _counters().items()}
+
+class SynthPool:
+    """
+    Worker processes that each hold their own Kokoro model, for long documents on
+    many-core CPUs. Chunks are handed out through the pool's work queue and audio
+    comes back in text order. Keep workers * threads_per_worker at or below the
+    number of physical cores; workers defaults to cores // threads_per_worker.
+    """
+    def __init__(self, workers=None, threads_per_worker=1, device="cpu", voice="ef_dora", precision=None):
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.workers = workers
+        self.lang_code = voice[0]
+        self.threads_per_worker = threads_per_worker
+        # Worker counters summed over every chunk this pool has synthesized
+        self.counters = dict.fromkeys(_counters(), 0)
+        # spawn: forked copies of an initialized torch runtime are not safe
+        ctx = multiprocessing.get_context("spawn")
+        self._pool = ctx.Pool(workers, initializer=_init_worker, initargs=(device, voice, threads_per_worker, precision))
+
+    def iter_chunks(self, text):
+        """Yield each chunk's audio in order as soon as it and all earlier chunks are done."""
+        for pieces, counters in self._pool.imap(_synthesize, split_text_for_tts(text, lang_code=self.lang_code)):
+            for k, v in counters.items():
+                self.counters[k] += v
+            yield from pieces
+
+    def stats(self):
+        """Re-split and cache counters of the workers (see _counters), which the parent's own stats miss."""
+        return dict(self.counters)
+
+    def close(self):
+        self._pool.close()
+        self._pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_synth_pool(workers=None, threads_per_worker=1, device="cpu", voice="ef_dora", precision=None):
+    """Process-wide SynthPool per configuration, so worker models are loaded only once."""
+    key = (workers, threads_per_worker, device, voice, precision)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = SynthPool(workers, threads_per_worker, device, voice, precision)
+        return _pools[key]
+
+@atexit.register
+def _close_pools():
+    for pool in _pools.values():
+        pool.close()
+    _pools.clear()
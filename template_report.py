@@ -0,0 +1,150 @@
+import random
+import string
+from datetime import datetime, timedelta
+from functools import lru_cache
+from weather_report import format_decimal, weather_fields
+
+# Alternative phrasings per bulletin segment, filled from weather_fields() plus
+# the spoken clock times below. Each sentence stands alone, so the same wording
+# with the same numbers hits the G2P and audio caches on later bulletins.
+OPENINGS = [
+    "Hola, les habla el informe del tiempo para {city}.",
+    "Buenas, este es el pronóstico para {city}.",
+    "Hola a todos, así está el tiempo en {city}.",
+]
+CURRENT = [
+    "En este momento hay {temp} grados, con {weather_desc}.",
+    "Ahora mismo la temperatura es de {temp} grados y tenemos {weather_desc}.",
+    "La temperatura actual es de {temp} grados, con {weather_desc}.",
+]
+FEELS_LIKE = [
+    "La sensación térmica es de {feels_like} grados.",
+    "Se siente como si hubiera {feels_like} grados.",
+]
+RANGE = [
+    "Hoy la mínima es de {temp_min} grados y la máxima de {temp_max}.",
+    "Durante el día vamos a tener entre {temp_min} y {temp_max} grados.",
+]
+HUMIDITY_WIND = [
+    "La humedad está en {humidity} por ciento y el viento sopla a {wind_kmh} kilómetros por hora.",
+    "Tenemos {humidity} por ciento de humedad y viento de {wind_kmh} kilómetros por hora.",
+]
+CLOUDS = [
+    "La nubosidad es del {clouds} por ciento.",
+    "El cielo está cubierto en un {clouds} por ciento.",
+]
+VISIBILITY = [
+    "La visibilidad es de {visibility_km} kilómetros.",
+]
+# Chosen by the observation time: before sunrise, during the day, after sunset
+SUN_BEFORE_SUNRISE = [
+    "El sol sale a las {sunrise} y se pone a las {sunset}.",
+    "Hoy amanece a las {sunrise} y el sol se pone a las {sunset}.",
+]
+SUN = [
+    "El sol salió a las {sunrise} y se pone a las {sunset}.",
+    "Hoy amaneció a las {sunrise} y el sol se pone a las {sunset}.",
+]
+SUN_AFTER_SUNSET = [
+    "El sol salió a las {sunrise} y se puso a las {sunset}.",
+]
+CLOSINGS = [
+    "¡Que tengan un lindo día!",
+    "Eso es todo por ahora, ¡hasta la próxima!",
+    "Gracias por escuchar, ¡cuídense!",
+]
+
+# Practical advice, chosen by the first matching condition on the raw values
+ADVICE = [
+    (lambda w: w['main']['temp'] <= 8, [
+        "Hace bastante frío, así que abríguense bien si van a salir.",
+        "Está frío: no se olviden de la campera y la bufanda.",
+    ]),
+    (lambda w: w['main']['temp'] >= 30, [
+        "Hace mucho calor: tomen agua y eviten el sol del mediodía.",
+        "Con este calor, busquen la sombra y mantengan la hidratación.",
+    ]),
+    (lambda w: w['weather'][0].get('main') in ('Rain', 'Drizzle', 'Thunderstorm'), [
+        "Lleven paraguas, que está lloviendo.",
+        "No salgan sin paraguas.",
+    ]),
+    (lambda w: w['wind']['speed'] >= 11, [  # m/s with units=metric
+        "Ojo con el viento fuerte, aseguren lo que pueda volarse.",
+    ]),
+    (lambda w: w['main']['humidity'] >= 85, [
+        "Con tanta humedad, la ropa va a tardar en secarse.",
+    ]),
+]
+
+@lru_cache(maxsize=None)
+def _parse(template):
+    """A template as (literal text, field name or None) pairs, parsed once."""
+    return tuple((literal, field) for literal, field, _, _ in string.Formatter().parse(template))
+
+def _all_templates():
+    groups = [OPENINGS, CURRENT, FEELS_LIKE, RANGE, HUMIDITY_WIND, CLOUDS, VISIBILITY,
+              SUN_BEFORE_SUNRISE, SUN, SUN_AFTER_SUNSET, CLOSINGS]
+    groups += [phrases for _, phrases in ADVICE]
+    return [template for group in groups for template in group]
+
+def template_phrases():
+    """Every fixed piece of wording the templates can produce (for pre-rendering, see phrase_bank)."""
+    pieces = {literal.strip() for template in _all_templates() for literal, _ in _parse(template)}
+    return sorted(p for p in pieces if any(c.isalpha() for c in p))
+
+def format_clock(ts, tz_offset):
+    """Local time of a Unix timestamp as spoken clock text, e.g. '7 y 05' or '18 en punto'."""
+    dt = datetime.utcfromtimestamp(ts) + timedelta(seconds=tz_offset)
+    if dt.minute == 0:
+        return f"{dt.hour} en punto"
+    return f"{dt.hour} y {dt.minute:02d}"
+
+def template_weather_report(weather_json, seed=None):
+    """
+    Spanish weather report built from phrase templates instead of the LLM, in
+    well under a millisecond. Phrasings vary between bulletins; seed defaults to
+    the observation time, so the same reading always gives the same text.
+    """
+    return "".join(text for text, _ in template_weather_segments(weather_json, seed))
+
+def template_weather_segments(weather_json, seed=None):
+    """
+    The report of template_weather_report as (text, fixed) segments: fixed
+    template wording (fixed=True) alternating with the values filled into it.
+    """
+    rng = random.Random(weather_json['dt'] if seed is None else seed)
+    tz_offset = weather_json.get('timezone', 0)
+    fields = weather_fields(weather_json)
+    fields["sunrise"] = format_clock(weather_json['sys']['sunrise'], tz_offset)
+    fields["sunset"] = format_clock(weather_json['sys']['sunset'], tz_offset)
+    # OpenWeatherMap gives m/s with units=metric; the bulletin says km/h
+    fields["wind_kmh"] = format_decimal(round(weather_json['wind']['speed'] * 3.6))
+    if fields["visibility"] is not None:
+        fields["visibility_km"] = format_decimal(fields["visibility"] / 1000)
+    segments = [OPENINGS, CURRENT]
+    if abs(weather_json['main']['feels_like'] - weather_json['main']['temp']) >= 1:
+        segments.append(FEELS_LIKE)
+    segments += [RANGE, HUMIDITY_WIND, CLOUDS]
+    if fields["visibility"] is not None and fields["visibility"] < 10000:
+        segments.append(VISIBILITY)
+    if weather_json['dt'] < weather_json['sys']['sunrise']:
+        segments.append(SUN_BEFORE_SUNRISE)
+    elif weather_json['dt'] < weather_json['sys']['sunset']:
+        segments.append(SUN)
+    else:
+        segments.append(SUN_AFTER_SUNSET)
+    for condition, phrases in ADVICE:
+        if condition(weather_json):
+            segments.append(phrases)
+            break
+    segments.append(CLOSINGS)
+    parts = []
+    for i, phrases in enumerate(segments):
+        if i:
+            parts.append((" ", True))
+        for literal, field in _parse(rng.choice(phrases)):
+            if literal:
+                parts.append((literal, True))
+            if field is not None:
+                parts.append((str(fields[field]), False))
+    return parts
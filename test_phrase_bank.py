@@ -0,0 +1,19 @@
+from phrase_bank import spoken_value
+from weather_report import format_decimal
+
+def test_decimal_fraction_keeps_leading_zero():
+    assert spoken_value("3 punto 05") == [("tres", True), ("punto", False), ("cero", True), ("cinco", True)]
+    assert spoken_value("17 punto 4") == [("diecisiete", True), ("punto", False), ("cuatro", True)]
+
+def test_clock_minutes_read_as_whole_number():
+    assert spoken_value("7 y 05") == [("siete", True), ("y", False), ("cinco", True)]
+    assert spoken_value("18 en punto") == [("dieciocho", True), ("en punto", False)]
+
+def test_negative_and_text_values():
+    assert spoken_value("-3 punto 5") == [("menos", True), ("tres", True), ("punto", False), ("cinco", True)]
+    assert spoken_value("nubes dispersas") == [("nubes dispersas", False)]
+
+def test_negative_values_between_minus_one_and_zero_keep_their_sign():
+    assert spoken_value(format_decimal(-0.5)) == [("menos", True), ("cero", True), ("punto", False), ("cinco", True)]
+    assert spoken_value(format_decimal(-0.05)) == [("menos", True), ("cero", True), ("punto", False),
+                                           ("cero", True), ("cinco", True)]
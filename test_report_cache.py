@@ -0,0 +1,35 @@
+from bench_generators import SAMPLE_WEATHER
+from report_cache import ReportCache, quantize_weather
+from weather_report import build_weather_prompt
+
+def test_quantize_weather_rounds_values_and_keeps_the_input():
+    weather = dict(SAMPLE_WEATHER, dt=1760540460, visibility=9400)
+    weather["main"] = dict(SAMPLE_WEATHER["main"], temp=17.6, humidity=72)
+    q = quantize_weather(weather)
+    assert q["main"]["temp"] == 18
+    assert q["main"]["humidity"] == 70
+    assert q["visibility"] == 9000
+    assert q["dt"] == 1760540400
+    assert q["sys"]["sunrise"] % 60 == 0
+    assert weather["main"]["temp"] == 17.6
+
+def test_close_readings_share_a_prompt():
+    a = dict(SAMPLE_WEATHER, main=dict(SAMPLE_WEATHER["main"], temp=17.8))
+    b = dict(SAMPLE_WEATHER, main=dict(SAMPLE_WEATHER["main"], temp=18.2))
+    assert build_weather_prompt(a) != build_weather_prompt(b)
+    assert build_weather_prompt(quantize_weather(a)) == build_weather_prompt(quantize_weather(b))
+
+def test_reports_expire_after_ttl(tmp_path):
+    cache = ReportCache(ttl=60, path=str(tmp_path / "reports.db"))
+    key = ReportCache.key("model", "prompt")
+    assert cache.get(key) is None
+    cache.put(key, "Hola.")
+    assert cache.get(key) == "Hola."
+    assert ReportCache(ttl=60, path=str(tmp_path / "reports.db")).get(key) == "Hola."
+    cache._entries[key] = ("Hola.", cache._entries[key][1] - 61)
+    assert cache.get(key) is None
+    assert cache.stats() == {"hits": 1, "misses": 2}
+
+def test_key_depends_on_model_and_prompt():
+    assert ReportCache.key("a", "prompt") != ReportCache.key("b", "prompt")
+    assert ReportCache.key("a", "prompt") == ReportCache.key("a", "prompt")
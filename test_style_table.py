@@ -0,0 +1,32 @@
+import torch
+from style_table import StyleTable
+from text_splitter import styles_for
+
+def test_indexing_matches_the_voice_pack():
+    pack = torch.randn(510, 1, 256)
+    table = StyleTable(pack, "cpu")
+    assert len(table) == 510
+    assert table[7].shape == (1, 256)
+    assert torch.equal(table[7], pack[7])
+
+def test_gather_picks_the_style_for_each_length():
+    pack = torch.randn(510, 1, 256)
+    styles = StyleTable(pack, "cpu").gather([1, 40, 510])
+    assert styles.shape == (3, 256)
+    assert torch.equal(styles, pack[[0, 39, 509], 0])
+
+def test_gather_clamps_out_of_range_lengths():
+    pack = torch.randn(510, 1, 256)
+    styles = StyleTable(pack, "cpu").gather([0, 600])
+    assert torch.equal(styles, pack[[0, 509], 0])
+
+def test_float32_cpu_pack_is_used_without_copying():
+    pack = torch.randn(510, 1, 256)
+    assert StyleTable(pack, "cpu").table.data_ptr() == pack.data_ptr()
+
+def test_styles_for_accepts_tables_and_raw_packs():
+    pack = torch.randn(510, 1, 256)
+    phonemes = ["a" * 5, "b" * 300]
+    gathered = styles_for(StyleTable(pack, "cpu"), phonemes)
+    single = styles_for(pack, phonemes)
+    assert all(torch.equal(a.flatten(), b.flatten()) for a, b in zip(gathered, single))
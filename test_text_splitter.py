@@ -0,0 +1,55 @@
+from bench_splitter import DIGIT_SENTENCES, SAMPLE_SENTENCES, make_text
+from text_splitter import DEFAULT_PHONEME_BUDGET, SentenceSegmenter, estimate_phonemes, split_text_for_tts
+
+def test_chunks_stay_within_the_budget():
+    for sentences in (SAMPLE_SENTENCES, DIGIT_SENTENCES):
+        text = make_text(50000, sentences=sentences)
+        chunks = split_text_for_tts(text, max_phonemes=300)
+        assert max(estimate_phonemes(c) for c in chunks) <= 300
+        assert " ".join(chunks).split() == text.split()
+
+def test_whole_sentences_are_packed_together():
+    assert split_text_for_tts("Hola. ¿Cómo están? Buen día.") == ["Hola. ¿Cómo están? Buen día."]
+    budget = estimate_phonemes("Hola. ¿Cómo están?")
+    assert split_text_for_tts("Hola. ¿Cómo están? Buen día.", max_phonemes=budget) == ["Hola. ¿Cómo están?", "Buen día."]
+
+def test_long_sentence_is_cut_after_clause_breaks():
+    clause = "el viento sopla del sureste con ráfagas fuertes"
+    text = ", ".join([clause] * 6) + "."
+    chunks = split_text_for_tts(text, max_phonemes=estimate_phonemes(clause) * 2 + 5)
+    assert len(chunks) == 3
+    assert all(c.endswith(",") for c in chunks[:-1])
+    assert " ".join(chunks) == text
+
+def test_long_sentence_without_clauses_is_cut_between_words():
+    text = " ".join(["palabra"] * 100) + "."
+    chunks = split_text_for_tts(text, max_phonemes=50)
+    assert all(estimate_phonemes(c) <= 50 for c in chunks)
+    assert " ".join(chunks) == text
+
+def test_single_overlong_word_is_hard_cut():
+    word = "a" * 1000
+    chunks = split_text_for_tts(word, max_phonemes=100)
+    assert "".join(chunks) == word
+    assert all(estimate_phonemes(c) <= 100 for c in chunks)
+
+def test_max_length_caps_characters():
+    text = make_text(5000)
+    chunks = split_text_for_tts(text, max_length=80)
+    assert all(len(c) <= 80 for c in chunks)
+
+def test_sentence_segmenter_matches_split_text_for_tts():
+    text = make_text(3000)
+    pieces = [text[i:i + 7] for i in range(0, len(text), 7)]
+    segmenter = SentenceSegmenter()
+    chunks = [c for piece in pieces for c in segmenter.feed(piece)] + segmenter.close()
+    assert " ".join(chunks).split() == text.split()
+    assert max(estimate_phonemes(c) for c in chunks) <= DEFAULT_PHONEME_BUDGET
+
+def test_sentence_segmenter_emits_finished_sentences_and_run_ons_early():
+    segmenter = SentenceSegmenter(max_phonemes=50)
+    assert segmenter.feed("Hola a tod") == []
+    assert segmenter.feed("os. Hoy") == ["Hola a todos."]
+    early = segmenter.feed(" hace" + " mucho calor y" * 10)
+    assert early and all(estimate_phonemes(c) <= 50 for c in early)
+    assert segmenter.close()
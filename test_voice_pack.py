@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+import torch
+from voice_pack import ALIGN, load_voice_pack, read_header, save_voice_pack, voice_path
+
+def test_float32_round_trip(tmp_path):
+    pack = torch.randn(510, 1, 256)
+    path = voice_path(str(tmp_path), "ef_dora")
+    save_voice_pack(pack, path, voice="ef_dora")
+    header, offset = read_header(path)
+    assert header == {"voice": "ef_dora", "dtype": "float32", "shape": [510, 1, 256]}
+    assert offset % ALIGN == 0
+    loaded = load_voice_pack(path)
+    assert loaded.dtype == torch.float32
+    assert torch.equal(loaded, pack)
+
+def test_float16_round_trip_loads_as_float32(tmp_path):
+    pack = np.random.default_rng(0).standard_normal((510, 1, 256)).astype(np.float32)
+    path = str(tmp_path / "ef_dora.kvp")
+    save_voice_pack(pack, path, dtype="float16")
+    loaded = load_voice_pack(path)
+    assert loaded.dtype == torch.float32
+    assert np.allclose(loaded.numpy(), pack, atol=1e-2)
+
+def test_loading_does_not_modify_the_file(tmp_path):
+    path = str(tmp_path / "ef_dora.kvp")
+    save_voice_pack(torch.zeros(4, 1, 256), path)
+    before = open(path, "rb").read()
+    load_voice_pack(path)[0] += 1
+    assert open(path, "rb").read() == before
+
+def test_rejects_other_files_and_dtypes(tmp_path):
+    path = str(tmp_path / "not_a_pack.kvp")
+    with open(path, "wb") as f:
+        f.write(b"PK\x03\x04" + bytes(64))
+    with pytest.raises(ValueError):
+        read_header(path)
+    with pytest.raises(ValueError):
+        save_voice_pack(torch.zeros(1, 1, 256), path, dtype="int8")
@@ -0,0 +1,64 @@
+import threading
+import pytest
+from weather_cache import WeatherCache
+
+KEY = ("Montevideo,UY", "metric", "es")
+
+def cache_with_entry(age, observed_age=None, **kwargs):
+    """A WeatherCache holding one entry fetched age seconds ago (observed observed_age seconds ago)."""
+    cache = WeatherCache(ttl=600, stale_ttl=3600, min_refresh=60, **kwargs)
+    cache.put(KEY, {"dt": 0, "v": "old"})
+    entry = cache._entries[KEY]
+    entry["fetched_at"] -= age
+    entry["data"]["dt"] = entry["fetched_at"] - (observed_age or 0)
+    return cache
+
+def fail():
+    raise AssertionError("fetch should not run")
+
+def test_fresh_entry_is_served_without_fetching():
+    cache = cache_with_entry(age=100)
+    assert cache.get_or_fetch(KEY, fail)["v"] == "old"
+    assert cache.stats() == {"hits": 1, "stale_hits": 0, "misses": 0}
+
+def test_recently_fetched_entry_is_fresh_even_if_observed_long_ago():
+    cache = cache_with_entry(age=30, observed_age=1000)
+    assert cache.get_or_fetch(KEY, fail)["v"] == "old"
+
+def test_stale_entry_is_served_while_refreshing_in_background():
+    cache = cache_with_entry(age=700)
+    started = threading.Event()
+    release = threading.Event()
+
+    def refresh():
+        started.set()
+        release.wait(5)
+        return {"dt": 0, "v": "new"}
+
+    assert cache.get_or_fetch(KEY, refresh)["v"] == "old"
+    assert started.wait(5)
+    # A second lookup during the refresh does not start another one
+    assert cache.get_or_fetch(KEY, fail)["v"] == "old"
+    release.set()
+    cache.join_refreshes()
+    assert cache._entries[KEY]["data"]["v"] == "new"
+    assert cache.stats()["stale_hits"] == 2
+
+def test_old_entry_is_fetched_synchronously():
+    cache = cache_with_entry(age=4000)
+    assert cache.get_or_fetch(KEY, lambda: {"dt": 0, "v": "new"})["v"] == "new"
+    assert cache.stats()["misses"] == 1
+
+def test_failed_fetch_falls_back_to_any_cached_entry():
+    def broken():
+        raise OSError("offline")
+
+    cache = cache_with_entry(age=4000)
+    assert cache.get_or_fetch(KEY, broken)["v"] == "old"
+    with pytest.raises(OSError):
+        WeatherCache().get_or_fetch(KEY, broken)
+
+def test_entries_persist_in_the_json_file(tmp_path):
+    path = str(tmp_path / "weather.json")
+    WeatherCache(path=path).put(KEY, {"dt": 0, "v": "saved"})
+    assert WeatherCache(path=path)._entries[KEY]["data"]["v"] == "saved"
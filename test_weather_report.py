@@ -0,0 +1,46 @@
+import pytest
+from weather_report import ThinkStripper, clean_report, parse_args
+
+def strip_stream(pieces):
+    stripper = ThinkStripper()
+    return "".join(stripper.feed(p) for p in pieces) + stripper.close()
+
+def test_think_stripper_matches_clean_report():
+    raw = "<think>Veamos los datos.</think>Hola. <THINK>otra vez</THINK>Hoy hace calor."
+    assert strip_stream([raw]).strip() == clean_report(raw)
+
+def test_think_stripper_handles_tags_split_across_pieces():
+    raw = "<think>hmm</think>Hola, buen día."
+    assert strip_stream(list(raw)) == "Hola, buen día."
+    assert strip_stream(["Hola <", "b>"]) == "Hola <b>"
+
+def test_think_stripper_holds_back_only_a_possible_tag():
+    stripper = ThinkStripper()
+    assert stripper.feed("Hola <thi") == "Hola "
+    assert stripper.feed("nk>secreto</th") == ""
+    assert stripper.feed("ink> chau") == " chau"
+
+@pytest.mark.parametrize("argv", [
+    ["--stream-llm", "--generator", "template"],
+    ["--stream-llm", "--workers", "2"],
+    ["--stream-llm", "--batch-size", "4"],
+    ["--stream-llm", "--pipelined"],
+    ["--stream-llm", "--tts-server", "http://127.0.0.1:8765"],
+    ["--phrase-bank", "bank"],
+    ["--phrase-bank", "bank", "--generator", "template", "--stream"],
+    ["--phrase-bank", "bank", "--generator", "template", "--workers", "2"],
+    ["--workers", "2", "--batch-size", "4"],
+])
+def test_parse_args_rejects_ignored_options(argv):
+    with pytest.raises(SystemExit):
+        parse_args(argv)
+
+@pytest.mark.parametrize("argv", [
+    ["--stream-llm"],
+    ["--stream-llm", "--stream"],
+    ["--phrase-bank", "bank", "--generator", "template"],
+    ["--workers", "2", "--stream"],
+    ["--batch-size", "4", "--pipelined"],
+])
+def test_parse_args_accepts_compatible_options(argv):
+    parse_args(argv)
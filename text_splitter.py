@@ -1,65 +1,319 @@
+import math
 import re
-import torch
+import threading
 import numpy as np
+from audio_cache import chunk_key, get_audio_cache
+from batch_synth import fits_context, forward_single, synthesize_batches
+from g2p_cache import get_g2p_cache
+from style_table import StyleTable
+from tts_registry import get_tts
 
-def split_text_for_tts(text, max_length=150):
+# In batched mode, this many batches are length-sorted together before their audio is yielded
+BATCH_WINDOW = 4
+
+# The model takes 512 tokens including the two boundary tokens
+MAX_PHONEMES = 510
+# Default chunk budget in estimated phonemes, leaving headroom for estimation error
+DEFAULT_PHONEME_BUDGET = 300
+
+# Rough phonemes per character by lang_code (stress marks included); digits
+# expand into number words, so they are counted separately
+PHONEMES_PER_CHAR = {'a': 1.1, 'b': 1.1, 'e': 1.25, 'f': 1.1, 'h': 1.2, 'i': 1.25, 'p': 1.25, 'j': 3.0, 'z': 3.0}
+DEFAULT_PHONEMES_PER_CHAR = 1.25
+PHONEMES_PER_DIGIT = 8
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+_DIGIT = re.compile(r'\d')
+_WORD_BREAK = re.compile(r'[,;:]?\s+')
+
+# Re-split oversized chunks into pieces filling at most this share of the model context
+RESPLIT_FILL = 0.9
+# G2P backends (espeak in particular) are not thread-safe
+_g2p_lock = threading.Lock()
+
+# How often synthesize_chunk had to re-split a chunk that did not fit the model
+SPLIT_STATS = {"resplit": 0, "pieces": 0, "failed": 0}
+
+def _estimate(text, lang_code, start, end):
+    """Unrounded estimate_phonemes. It is additive over adjacent spans, so the
+    splitters can sum word and separator costs and get the estimate of the chunk."""
+    digits = len(_DIGIT.findall(text, start, end))
+    ratio = PHONEMES_PER_CHAR.get(lang_code, DEFAULT_PHONEMES_PER_CHAR)
+    return ratio * (end - start - digits) + PHONEMES_PER_DIGIT * digits
+
+def estimate_phonemes(text, lang_code='e', start=0, end=None):
+    """Cheap estimate of the phoneme count of text[start:end], without slicing it."""
+    if end is None:
+        end = len(text)
+    return int(_estimate(text, lang_code, start, end) + 0.5)
+
+def _sentence_spans(text):
+    """Yield (start, end) offsets of the sentences in text."""
+    start = 0
+    for m in _SENTENCE_BREAK.finditer(text):
+        yield start, m.start()
+        start = m.end()
+    yield start, len(text)
+
+def _even_cuts(start, end, pieces):
+    """Cut the span [start, end) into `pieces` equal character slices."""
+    step = -(-(end - start) // pieces)
+    return [(i, min(i + step, end)) for i in range(start, end, step)]
+
+def _word_units(text, start, end):
+    """
+    Yield (start, end, clause, next_start) for the words of text[start:end]. A word
+    keeps its trailing clause punctuation (,;:), in which case clause is True.
+    """
+    pos = start
+    for m in _WORD_BREAK.finditer(text, start, end):
+        clause = m.group()[0] in ',;:'
+        word_end = m.start() + 1 if clause else m.start()
+        if word_end > pos:
+            yield pos, word_end, clause, m.end()
+        pos = m.end()
+    if end > pos:
+        yield pos, end, False, end
+
+def _split_long_sentence(text, start, end, lang_code, max_phonemes, max_length=None):
+    """
+    Split one over-long sentence text[start:end] into (start, end) spans that fit
+    max_phonemes (and max_length characters), in one pass over its words. A span is
+    cut after the last clause break (,;:) that fits, else after the last whole word;
+    only a single word longer than the budget is hard-cut.
+    """
+    spans = []
+    seg_start = seg_end = None
+    seg_cost = 0
+    clause = None  # (end, next_start, cost up to next_start) of the last clause break in the segment
+    for w_start, w_end, w_clause, w_next in _word_units(text, start, end):
+        cost = _estimate(text, lang_code, w_start, w_end)
+        # The separator since the previous word, charged at its own estimate
+        gap = _estimate(text, lang_code, seg_end, w_start) if seg_start is not None else 0
+        while seg_start is not None and (seg_cost + gap + cost > max_phonemes
+                                         or (max_length is not None and w_end - seg_start > max_length)):
+            if clause is not None and clause[0] < seg_end:
+                # Cut at the clause break; the words after it carry over
+                spans.append((seg_start, clause[0]))
+                seg_start, seg_cost = clause[1], seg_cost - clause[2]
+            else:
+                spans.append((seg_start, seg_end))
+                seg_start, seg_cost, gap = None, 0, 0
+            clause = None
+        if cost > max_phonemes or (max_length is not None and w_end - w_start > max_length):
+            # A single word over the budget: hard cut it into equal slices
+            pieces = math.ceil(cost / max_phonemes)
+            if max_length is not None:
+                pieces = max(pieces, -(-(w_end - w_start) // max_length))
+            spans.extend(_even_cuts(w_start, w_end, pieces))
+            continue
+        if seg_start is None:
+            seg_start, seg_cost = w_start, cost
+        else:
+            seg_cost += gap + cost
+        seg_end = w_end
+        if w_clause:
+            clause = (w_end, w_next, seg_cost + _estimate(text, lang_code, w_end, w_next))
+    if seg_start is not None:
+        spans.append((seg_start, seg_end))
+    return spans
+
+def split_text_for_tts(text, max_length=None, lang_code='e', max_phonemes=DEFAULT_PHONEME_BUDGET):
     """
     Splits text into chunks suitable for TTS synthesis.
-    Tries to split at sentence boundaries, but will further split long sentences if needed.
-    """
-    # First, split by sentence-ending punctuation
-    sentences = re.split(r'(?<=[.!?])\s+', text)
-    chunks = []
-    current = ''
-    for sentence in sentences:
-        if len(current) + len(sentence) + 1 <= max_length:
-            current = (current + ' ' + sentence).strip()
+    Packs whole sentences into chunks of at most max_phonemes estimated phonemes
+    (see estimate_phonemes). A sentence too long on its own is cut at clause
+    punctuation, else between words, else mid-word (see _split_long_sentence).
+    max_length optionally also caps chunks in characters. Runs in one pass over
+    sentence offsets; each chunk is sliced out of text once.
+    """
+    spans = []
+    chunk_start = chunk_end = None
+    chunk_cost = 0
+    for start, end in _sentence_spans(text):
+        cost = _estimate(text, lang_code, start, end)
+        gap = _estimate(text, lang_code, chunk_end, start) if chunk_start is not None else 0
+        if (chunk_start is not None and chunk_cost + gap + cost <= max_phonemes
+                and (max_length is None or end - chunk_start <= max_length)):
+            chunk_end = end
+            chunk_cost += gap + cost
+            continue
+        if chunk_start is not None:
+            spans.append((chunk_start, chunk_end))
+        if cost > max_phonemes or (max_length is not None and end - start > max_length):
+            # Sentence too long on its own: fall back to clause and word boundaries
+            spans.extend(_split_long_sentence(text, start, end, lang_code, max_phonemes, max_length))
+            chunk_start = None
+            chunk_cost = 0
         else:
-            if current:
-                chunks.append(current)
-            if len(sentence) > max_length:
-                # Further split long sentences
-                for i in range(0, len(sentence), max_length):
-                    chunks.append(sentence[i:i+max_length])
-                current = ''
-            else:
-                current = sentence
-    if current:
-        chunks.append(current)
-    return [c.strip() for c in chunks if c.strip()]
+            chunk_start, chunk_end, chunk_cost = start, end, cost
+    if chunk_start is not None:
+        spans.append((chunk_start, chunk_end))
+    chunks = (text[start:end].strip() for start, end in spans)
+    return [c for c in chunks if c]
 
-def safe_tts_chunks(pipeline, model, pack, text, voice):
+class SentenceSegmenter:
+    """
+    Incremental split_text_for_tts for text that arrives in pieces (e.g. streamed
+    LLM tokens). feed() returns the chunks completed so far: every finished
+    sentence right away, and the leading part of a sentence that has already
+    outgrown max_phonemes. close() returns whatever is left.
+    """
+    def __init__(self, lang_code='e', max_phonemes=DEFAULT_PHONEME_BUDGET):
+        self.lang_code = lang_code
+        self.max_phonemes = max_phonemes
+        self.buffer = ''
+
+    def feed(self, text):
+        self.buffer += text
+        last = None
+        for last in _SENTENCE_BREAK.finditer(self.buffer):
+            pass
+        chunks = []
+        if last is not None:
+            chunks = split_text_for_tts(self.buffer[:last.start()], lang_code=self.lang_code,
+                                        max_phonemes=self.max_phonemes)
+            self.buffer = self.buffer[last.end():]
+        if estimate_phonemes(self.buffer, self.lang_code) > self.max_phonemes:
+            # A run-on sentence: emit the pieces that are already final
+            spans = _split_long_sentence(self.buffer, 0, len(self.buffer), self.lang_code, self.max_phonemes)
+            chunks.extend(self.buffer[start:end].strip() for start, end in spans[:-1])
+            self.buffer = self.buffer[spans[-1][0]:]
+        return [c for c in chunks if c]
+
+    def close(self):
+        chunks = split_text_for_tts(self.buffer, lang_code=self.lang_code, max_phonemes=self.max_phonemes)
+        self.buffer = ''
+        return chunks
+
+def iter_sentence_chunks(pieces, lang_code='e', max_phonemes=DEFAULT_PHONEME_BUDGET):
+    """Yield TTS chunks from an iterable of text pieces as soon as each one is complete."""
+    segmenter = SentenceSegmenter(lang_code, max_phonemes)
+    for piece in pieces:
+        yield from segmenter.feed(piece)
+    yield from segmenter.close()
+
+def phonemize(pipeline, chunk, cache=None):
+    """
+    Run G2P only (no synthesis) and return the phoneme string for a text chunk.
+    Results are cached per lang_code; cache defaults to the process-wide G2P cache.
+    """
+    if cache is None:
+        cache = get_g2p_cache()
+    ps = cache.get(pipeline.lang_code, chunk)
+    if ps is None:
+        with _g2p_lock:
+            ps = pipeline.g2p(chunk)[0] or ''
+        cache.put(pipeline.lang_code, chunk, ps)
+    return ps
+
+def style_for(pack, ps):
+    """Pick the voice pack reference style for a phoneme sequence, indexed by its length."""
+    return pack[min(len(ps)-1, len(pack)-1)]
+
+def styles_for(pack, phoneme_list):
+    """Reference styles for several phoneme sequences, gathered in one operation from a StyleTable."""
+    if isinstance(pack, StyleTable):
+        return list(pack.gather([len(ps) for ps in phoneme_list]))
+    return [style_for(pack, ps) for ps in phoneme_list]
+
+def to_numpy(audio):
+    """Convert model output to a numpy array."""
+    if hasattr(audio, 'detach'):
+        return audio.detach().cpu().numpy()
+    return np.asarray(audio)
+
+def safe_tts_chunks(pipeline, model, pack, text, voice, device=None, batch_size=1, audio_cache=None, speed=1):
     """
     Synthesize TTS audio for text, splitting further if a chunk is too long for the model.
+    Pass None for pipeline/model/pack to use the shared instances from tts_registry.
+    With batch_size > 1, chunks of similar length are run through the model together.
     """
-    audio_segments = []
-    for chunk in split_text_for_tts(text):
-        try:
-            ps = None
-            for _, ps_candidate, _ in pipeline(chunk, voice):
-                ps = ps_candidate
-                break
-            if isinstance(ps, tuple):
-                ps_for_model = ps[0]
-            else:
-                ps_for_model = ps
-            idx = min(len(ps_for_model)-1, len(pack)-1) if hasattr(ps_for_model, '__len__') else len(pack)-1
-            ref_s = pack[idx]
-            with torch.no_grad():
-                audio = model(ps_for_model, ref_s, speed=1)
-            if hasattr(audio, 'detach'):
-                audio_np = audio.detach().cpu().numpy()
-            else:
-                audio_np = np.array(audio)
-            audio_segments.append(audio_np)
-        except AssertionError as e:
-            # If chunk is still too long, split by half and retry
-            if len(chunk) > 50:
-                mid = len(chunk) // 2
-                left = chunk[:mid]
-                right = chunk[mid:]
-                audio_segments.extend(safe_tts_chunks(pipeline, model, pack, left, voice))
-                audio_segments.extend(safe_tts_chunks(pipeline, model, pack, right, voice))
-            else:
-                print(f"[TTS ERROR] Could not synthesize chunk: {chunk[:30]}... (len={len(chunk)})")
-    return audio_segments
+    return list(iter_tts_chunks(pipeline, model, pack, text, voice, device, batch_size, audio_cache, speed))
+
+def iter_tts_chunks(pipeline, model, pack, text, voice, device=None, batch_size=1, audio_cache=None, speed=1):
+    """
+    Streaming version of safe_tts_chunks: yields each chunk's audio as soon as it is synthesized.
+    audio_cache defaults to the process-wide cache (enabled by KOKORO_AUDIO_CACHE).
+    """
+    if pipeline is None or model is None or pack is None:
+        model, pipeline, pack = get_tts(device, voice=voice)
+    if audio_cache is None:
+        audio_cache = get_audio_cache()
+    if batch_size > 1:
+        yield from _iter_batched_chunks(pipeline, model, pack, text, voice, batch_size, audio_cache, speed)
+        return
+    for chunk in split_text_for_tts(text, lang_code=pipeline.lang_code):
+        yield from synthesize_cached_chunk(pipeline, model, pack, chunk, voice, audio_cache, speed)
+
+def synthesize_cached_chunk(pipeline, model, pack, chunk, voice, audio_cache, speed=1):
+    """synthesize_chunk through the audio cache; retry pieces of a chunk are stored as one entry."""
+    if audio_cache is None:
+        yield from synthesize_chunk(pipeline, model, pack, chunk, voice, speed)
+        return
+    key = chunk_key(model, chunk, voice, speed)
+    audio = audio_cache.get(key)
+    if audio is None:
+        pieces = list(synthesize_chunk(pipeline, model, pack, chunk, voice, speed))
+        if not pieces:
+            return
+        audio = np.concatenate(pieces) if len(pieces) > 1 else pieces[0]
+        audio_cache.put(key, audio)
+    yield audio
+
+def synthesize_chunk(pipeline, model, pack, chunk, voice, speed=1):
+    """
+    Yield the audio for one chunk. The phoneme length is checked against the model
+    context before inference; an oversized chunk is re-split at clause or word
+    boundaries into pieces that should fit, instead of failing a forward pass.
+    """
+    ps = phonemize(pipeline, chunk)
+    if not ps:
+        return
+    if fits_context(model, ps):
+        yield to_numpy(forward_single(model, ps, style_for(pack, ps), speed))
+        return
+    # Scale the estimate budget by how far the estimate undershot for this chunk
+    estimate = estimate_phonemes(chunk, pipeline.lang_code)
+    budget = int(estimate * (model.context_length - 2) * RESPLIT_FILL / len(ps))
+    parts = split_text_for_tts(chunk, lang_code=pipeline.lang_code, max_phonemes=max(1, budget))
+    if len(parts) < 2:
+        SPLIT_STATS["failed"] += 1
+        print(f"[TTS ERROR] Could not synthesize chunk: {chunk[:30]}... (len={len(chunk)})")
+        return
+    SPLIT_STATS["resplit"] += 1
+    SPLIT_STATS["pieces"] += len(parts)
+    for part in parts:
+        yield from synthesize_chunk(pipeline, model, pack, part, voice, speed)
+
+def _iter_batched_chunks(pipeline, model, pack, text, voice, batch_size, audio_cache=None, speed=1):
+    """
+    Batched variant of iter_tts_chunks. Chunks are taken BATCH_WINDOW batches at a
+    time so output can still be streamed; chunks that do not fit the model go
+    through the retry path.
+    """
+    chunks = split_text_for_tts(text, lang_code=pipeline.lang_code)
+    window = batch_size * BATCH_WINDOW
+    for start in range(0, len(chunks), window):
+        group = chunks[start:start + window]
+        cached = {}
+        if audio_cache is not None:
+            for i, chunk in enumerate(group):
+                audio = audio_cache.get(chunk_key(model, chunk, voice, speed))
+                if audio is not None:
+                    cached[i] = audio
+        phonemes = [None if i in cached else phonemize(pipeline, chunk) for i, chunk in enumerate(group)]
+        batchable = [i for i, ps in enumerate(phonemes) if ps and fits_context(model, ps)]
+        batch_ps = [phonemes[i] for i in batchable]
+        items = list(zip(batch_ps, styles_for(pack, batch_ps)))
+        batched = dict(zip(batchable, synthesize_batches(model, items, batch_size, speed)))
+        if audio_cache is not None:
+            for i, audio in batched.items():
+                audio_cache.put(chunk_key(model, group[i], voice, speed), audio)
+        for i, chunk in enumerate(group):
+            if i in cached:
+                yield cached[i]
+            elif i in batched:
+                yield batched[i]
+            elif phonemes[i]:
+                yield from synthesize_cached_chunk(pipeline, model, pack, chunk, voice, audio_cache, speed)
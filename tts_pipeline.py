@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+from batch_synth import fits_context, forward_single, synthesize_batches
+from audio_cache import chunk_key, get_audio_cache
+from text_splitter import split_text_for_tts, phonemize, style_for, styles_for, to_numpy, synthesize_cached_chunk
+
+_DONE = object()
+
+class _Stage:
+    """Timing counters for one pipeline stage."""
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.wait = 0.0
+        self.items = 0
+
+    def as_dict(self):
+        return {"busy": self.busy, "wait": self.wait, "items": self.items}
+
+def _put(q, item, stop, stage):
+    """Blocking put that gives up once another stage has failed."""
+    t0 = time.time()
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            break
+        except queue.Full:
+            pass
+    stage.wait += time.time() - t0
+
+def _get(q, stop, stage):
+    t0 = time.time()
+    item = _DONE
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=0.1)
+            break
+        except queue.Empty:
+            pass
+    stage.wait += time.time() - t0
+    return item
+
+def run_staged_tts(pipeline, model, pack, text, voice, sink, batch_size=1, queue_size=4, audio_cache=None):
+    """
+    Synthesize text into sink through three overlapping stages joined by bounded queues:
+    a G2P thread working ahead on upcoming chunks, inference on the calling thread,
+    and a thread converting and writing the audio. With batch_size > 1 the inference
+    stage batches whatever phonemized chunks are already waiting. Chunks found in the
+    audio cache (default: the process-wide one) skip G2P and inference.
+    Returns per-stage counters (busy/wait seconds, items) and time to first audio.
+    """
+    if audio_cache is None:
+        audio_cache = get_audio_cache()
+    g2p_stage, infer_stage, write_stage = _Stage("g2p"), _Stage("inference"), _Stage("write")
+    phoneme_q = queue.Queue(maxsize=queue_size)
+    audio_q = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    t_start = time.time()
+    first_audio = []
+
+    def g2p_worker():
+        try:
+            for chunk in split_text_for_tts(text, lang_code=pipeline.lang_code):
+                # Another stage failed: stop phonemizing chunks nobody will synthesize
+                if stop.is_set():
+                    break
+                t0 = time.time()
+                audio = audio_cache.get(chunk_key(model, chunk, voice)) if audio_cache is not None else None
+                ps = phonemize(pipeline, chunk) if audio is None else None
+                g2p_stage.busy += time.time() - t0
+                g2p_stage.items += 1
+                _put(phoneme_q, (chunk, ps, audio), stop, g2p_stage)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(phoneme_q, _DONE, stop, g2p_stage)
+
+    def write_worker():
+        try:
+            while True:
+                audio = _get(audio_q, stop, write_stage)
+                if audio is _DONE:
+                    break
+                t0 = time.time()
+                sink.write(to_numpy(audio))
+                if not first_audio:
+                    first_audio.append(time.time() - t_start)
+                write_stage.busy += time.time() - t0
+                write_stage.items += 1
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=g2p_worker, daemon=True), threading.Thread(target=write_worker, daemon=True)]
+    for thread in threads:
+        thread.start()
+    try:
+        done = False
+        while not done:
+            first = _get(phoneme_q, stop, infer_stage)
+            if first is _DONE:
+                break
+            group = [first]
+            while len(group) < batch_size:
+                try:
+                    item = phoneme_q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    done = True
+                    break
+                group.append(item)
+            t0 = time.time()
+            outputs = _infer_group(pipeline, model, pack, voice, group, batch_size, audio_cache)
+            infer_stage.busy += time.time() - t0
+            infer_stage.items += len(group)
+            for audio in outputs:
+                _put(audio_q, audio, stop, infer_stage)
+    except Exception as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(audio_q, _DONE, stop, infer_stage)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+    return {
+        "stages": {stage.name: stage.as_dict() for stage in (g2p_stage, infer_stage, write_stage)},
+        "first_audio": first_audio[0] if first_audio else None,
+    }
+
+def _infer_group(pipeline, model, pack, voice, group, batch_size, audio_cache):
+    """
+    Synthesize a group of (chunk, phonemes, cached audio) in order, storing new audio
+    in the cache. Chunks too long for the model go through the retry path.
+    """
+    results = [[audio] if audio is not None else [] for _, _, audio in group]
+    fresh = [i for i, (_, ps, audio) in enumerate(group) if audio is None and ps and fits_context(model, ps)]
+    if batch_size > 1 and fresh:
+        phonemes = [group[i][1] for i in fresh]
+        items = list(zip(phonemes, styles_for(pack, phonemes)))
+        for i, audio in zip(fresh, synthesize_batches(model, items, batch_size)):
+            results[i] = [audio]
+    else:
+        for i in fresh:
+            ps = group[i][1]
+            results[i] = [to_numpy(forward_single(model, ps, style_for(pack, ps)))]
+    if audio_cache is not None:
+        for i in fresh:
+            audio_cache.put(chunk_key(model, group[i][0], voice), results[i][0])
+    for i, (chunk, ps, audio) in enumerate(group):
+        if audio is None and ps and not fits_context(model, ps):
+            results[i] = list(synthesize_cached_chunk(pipeline, model, pack, chunk, voice, audio_cache))
+    return [audio for pieces in results for audio in pieces]
+
+def format_stage_stats(stats):
+    """One-line summary of run_staged_tts counters, naming the busiest stage."""
+    stages = stats["stages"]
+    parts = [f"{name} {s['busy']:.2f}s busy/{s['wait']:.2f}s wait ({s['items']})" for name, s in stages.items()]
+    bottleneck = max(stages, key=lambda name: stages[name]["busy"])
+    return "Pipeline stages: " + ", ".join(parts) + f"; bottleneck: {bottleneck}"
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+# Process-wide cache of loaded Kokoro objects: one KModel per (device, precision),
+# and model-less KPipelines that only do G2P and voice loading. torch and
+# kokoro are imported on first use, so preload() can move even that import off
+# the caller's thread.
+_lock = threading.RLock()
+_models = {}
+_pipelines = {}
+_voices = {}
+_stats = {"hits": 0, "misses": 0, "load_times": {}}
+
+def select_device():
+    """Select the best available device: CUDA, MPS, or CPU."""
+    import torch
+    if torch.cuda.is_available():
+        return "cuda"
+    elif torch.backends.mps.is_available():
+        return "mps"
+    else:
+        return "cpu"
+
+def _timed_load(name, loader):
+    t0 = time.time()
+    value = loader()
+    _stats["load_times"][name] = time.time() - t0
+    return value
+
+def get_model(device, precision=None):
+    """
+    Return the shared KModel for a device and precision (see precision.py; default
+    KOKORO_PRECISION or fp32), loading it on first use.
+    """
+    from precision import apply_precision, check_precision, default_precision
+    precision = precision or default_precision()
+    key = (device, precision)
+    with _lock:
+        if key not in _models:
+            from kokoro import KModel
+            check_precision(precision, device)
+            _models[key] = _timed_load(f"model:{device}/{precision}",
+                                       lambda: apply_precision(KModel().to(device).eval(), precision))
+        return _models[key]
+
+def get_pipeline(device, lang_code):
+    """Return the shared KPipeline for (device, lang_code), used for G2P and voice loading only."""
+    key = (device, lang_code)
+    with _lock:
+        if key not in _pipelines:
+            from kokoro import KPipeline
+            _pipelines[key] = _timed_load(f"pipeline:{device}/{lang_code}",
+                                          lambda: KPipeline(lang_code=lang_code, model=False))
+        return _pipelines[key]
+
+def _load_voice(pipeline, voice):
+    """Memory-map a converted pack from KOKORO_VOICE_DIR if there is one, else load it with the pipeline."""
+    voice_dir = os.environ.get("KOKORO_VOICE_DIR")
+    if voice_dir:
+        from voice_pack import load_voice_pack, voice_path
+        path = voice_path(voice_dir, voice)
+        if os.path.exists(path):
+            pack = load_voice_pack(path)
+            pipeline.voices[voice] = pack
+            return pack
+    return pipeline.load_voice(voice)
+
+def get_voice(device, lang_code, voice):
+    """Return the voice pack for (device, lang_code, voice) as a StyleTable on that device."""
+    key = (device, lang_code, voice)
+    with _lock:
+        if key not in _voices:
+            from style_table import StyleTable
+            pipeline = get_pipeline(device, lang_code)
+            _voices[key] = _timed_load(f"voice:{device}/{lang_code}/{voice}",
+                                       lambda: StyleTable(_load_voice(pipeline, voice), device))
+        return _voices[key]
+
+def get_tts(device=None, lang_code=None, voice="ef_dora", precision=None):
+    """
+    Return (model, pipeline, pack) for a voice, loading whatever is missing.
+    lang_code defaults to the voice prefix (e.g. 'e' for 'ef_dora').
+    """
+    from precision import default_precision
+    if device is None:
+        device = select_device()
+    if lang_code is None:
+        lang_code = voice[0]
+    precision = precision or default_precision()
+    with _lock:
+        if (device, lang_code, voice) in _voices and (device, precision) in _models:
+            _stats["hits"] += 1
+        else:
+            _stats["misses"] += 1
+        model = get_model(device, precision)
+        pack = get_voice(device, lang_code, voice)
+        return model, _pipelines[(device, lang_code)], pack
+
+def warm_up(device=None, lang_code=None, voice="ef_dora", text=None, precision=None):
+    """
+    Load the model, pipeline and voice ahead of the first request.
+    If text is given, also run one synthesis so device kernels are initialized.
+    """
+    model, pipeline, pack = get_tts(device, lang_code, voice, precision)
+    if text:
+        from batch_synth import forward_single
+        t0 = time.time()
+        ps = pipeline.g2p(text)[0]
+        forward_single(model, ps, pack[min(len(ps), len(pack)) - 1])
+        _stats["load_times"][f"warmup:{model.device}/{voice}"] = time.time() - t0
+    return model, pipeline, pack
+
+def preload(device=None, lang_code=None, voice="ef_dora", text=None, precision=None):
+    """
+    Start warm_up() in a background daemon thread and return a Future for its
+    (model, pipeline, pack). get_tts() calls made meanwhile wait for the load
+    instead of starting a second one, so callers can simply go on and call
+    get_tts() when they need the model.
+    """
+    future = Future()
+
+    def run():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(warm_up(device, lang_code, voice, text, precision))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="tts-preload", daemon=True).start()
+    return future
+
+def registry_stats():
+    """Return a snapshot of hit/miss counts and load times (seconds) per component."""
+    with _lock:
+        return {
+            "hits": _stats["hits"],
+            "misses": _stats["misses"],
+            "load_times": dict(_stats["load_times"]),
+        }
+
+def clear_registry():
+    """Drop all cached models, pipelines and voices (e.g. to free device memory)."""
+    with _lock:
+        _models.clear()
+        _pipelines.clear()
+        _voices.clear()
@@ -0,0 +1,336 @@
+# Resident Kokoro TTS server: loads the model once and synthesizes text sent over
+# local HTTP or a Unix socket, streaming the audio back as it is generated.
+# Usage: python tts_server.py --port 8765   or   python tts_server.py --socket /tmp/kokoro.sock
+#
+# POST /synthesize with a JSON body {"text": ..., "voice": "ef_dora", "speed": 1.0, "format": "wav"}
+# returns chunked audio: "wav" (16-bit, streaming header), "pcm" (s16le) or "f32" (f32le),
+# mono at 24 kHz. GET /health returns queue and model registry stats as JSON.
+
+import argparse
+import http.client
+import json
+import os
+import queue
+import re
+import socket
+import socketserver
+import struct
+import threading
+import time
+import numpy as np
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from audio_cache import get_audio_cache
+from audio_sink import SAMPLE_RATE
+from batch_scheduler import BatchScheduler
+from text_splitter import iter_tts_chunks
+from tts_registry import get_model, get_tts, registry_stats, select_device, warm_up
+
+FORMATS = {"wav": "audio/wav", "pcm": "audio/L16", "f32": "application/octet-stream"}
+DEFAULT_VOICE = "ef_dora"
+MIN_SPEED, MAX_SPEED = 0.5, 2.0
+# Kokoro voice names: language and gender letters, then a name (e.g. ef_dora). Anything
+# else could reach the hub, a voice file path or KOKORO_VOICE_DIR/../, and would add
+# a pipeline per new first letter.
+VOICE_NAME = re.compile(r'[a-z]{2}_[a-z]+')
+
+_DONE = object()
+
+def wav_header(sample_rate=SAMPLE_RATE):
+    """Header for a 16-bit mono WAV stream of unknown length (sizes set to the maximum)."""
+    return (b"RIFF" + struct.pack("<I", 0xFFFFFFFF) + b"WAVE"
+            + b"fmt " + struct.pack("<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16)
+            + b"data" + struct.pack("<I", 0xFFFFFFFF))
+
+def encode_audio(audio, fmt):
+    """Encode a float audio chunk as raw little-endian samples for the given format."""
+    audio = np.asarray(audio, dtype=np.float32)
+    if fmt == "f32":
+        return audio.astype("<f4").tobytes()
+    return (np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes()
+
+class _Job:
+    """One synthesis request; audio chunks flow back to the handler through self.audio."""
+    def __init__(self, text, voice, speed):
+        self.text = text
+        self.voice = voice
+        self.speed = speed
+        self.audio = queue.Queue()
+        self.cancelled = threading.Event()
+        self.queued_at = time.time()
+
+class TTSService:
+    """
+    Keeps Kokoro models warm and synthesizes requests one at a time on a single
+    worker thread, in arrival order. At most queue_size requests wait; further
+    submissions are rejected so clients can back off instead of piling up.
+    With max_batch > 1, up to max_batch requests run at once and their chunks are
+    merged into shared batches by a BatchScheduler (see batch_scheduler).
+    """
+    def __init__(self, device=None, batch_size=1, queue_size=16, max_batch=1, max_wait_ms=20):
+        self.device = device or select_device()
+        self.batch_size = batch_size
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.served = 0
+        self.failed = 0
+        self._stats_lock = threading.Lock()
+        self.scheduler = None
+        if max_batch > 1:
+            self.scheduler = BatchScheduler(get_model(self.device), max_batch, max_wait_ms)
+        self._workers = [threading.Thread(target=self._run, name=f"tts-worker-{i}", daemon=True)
+                         for i in range(max(1, max_batch))]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, text, voice=DEFAULT_VOICE, speed=1.0):
+        """Queue a request and return its job; raises queue.Full when the queue is full."""
+        job = _Job(text, voice, speed)
+        self.jobs.put_nowait(job)
+        return job
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            if job.cancelled.is_set():
+                continue
+            try:
+                model, pipeline, pack = get_tts(self.device, voice=job.voice)
+                if self.scheduler is not None:
+                    chunks = self.scheduler.iter_chunks(pipeline, pack, job.text, job.voice,
+                                                        job.speed, get_audio_cache())
+                else:
+                    chunks = iter_tts_chunks(pipeline, model, pack, job.text, job.voice,
+                                             batch_size=self.batch_size, speed=job.speed)
+                for audio in chunks:
+                    if job.cancelled.is_set():
+                        break
+                    job.audio.put(audio)
+                chunks.close()
+                with self._stats_lock:
+                    self.served += 1
+            except Exception as e:
+                with self._stats_lock:
+                    self.failed += 1
+                job.audio.put(e)
+            finally:
+                job.audio.put(_DONE)
+
+    def stats(self):
+        stats = {
+            "device": self.device,
+            "queued": self.jobs.qsize(),
+            "served": self.served,
+            "failed": self.failed,
+            "registry": registry_stats(),
+        }
+        if self.scheduler is not None:
+            stats["batching"] = self.scheduler.stats()
+        return stats
+
+    def close(self):
+        for _ in self._workers:
+            self.jobs.put(None)
+        for worker in self._workers:
+            worker.join()
+        if self.scheduler is not None:
+            self.scheduler.close()
+
+class TTSRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # needed for chunked transfer encoding
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        if isinstance(self.client_address, tuple):
+            return self.client_address[0]
+        return "unix"
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send_json(404, {"error": "not found"})
+            return
+        self._send_json(200, self.server.tts.stats())
+
+    def do_POST(self):
+        if self.path != "/synthesize":
+            self._send_json(404, {"error": "not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            text, voice, speed, fmt = self._parse(request)
+        except (ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+            return
+        try:
+            job = self.server.tts.submit(text, voice, speed)
+        except queue.Full:
+            self._send_json(503, {"error": "too many queued requests"})
+            return
+        # Wait for the first chunk so load errors can still be reported with a status code
+        first = job.audio.get()
+        if isinstance(first, Exception):
+            job.audio.get()  # _DONE
+            self._send_json(500, {"error": str(first)})
+            return
+        wait = time.time() - job.queued_at
+        self.send_response(200)
+        self.send_header("Content-Type", FORMATS[fmt])
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        samples = 0
+        try:
+            if fmt == "wav":
+                self._write_chunk(wav_header())
+            item = first
+            while item is not _DONE:
+                if isinstance(item, Exception):
+                    # Headers are already sent: end the stream without the final chunk
+                    print(f"[TTS ERROR] Synthesis failed mid-stream: {item}")
+                    self.close_connection = True
+                    return
+                self._write_chunk(encode_audio(item, fmt))
+                samples += len(item)
+                item = job.audio.get()
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            job.cancelled.set()
+            self.close_connection = True
+            return
+        self.log_message("synthesized %.2fs audio, first chunk after %.2fs, total %.2fs",
+                         samples / SAMPLE_RATE, wait, time.time() - job.queued_at)
+
+    @staticmethod
+    def _parse(request):
+        if not isinstance(request, dict):
+            raise ValueError("request body must be a JSON object")
+        text = request.get("text")
+        if not isinstance(text, str) or not text.strip():
+            raise ValueError("'text' must be a non-empty string")
+        voice = request.get("voice", DEFAULT_VOICE)
+        if not isinstance(voice, str) or not VOICE_NAME.fullmatch(voice):
+            raise ValueError("'voice' must be a voice name such as 'ef_dora'")
+        speed = float(request.get("speed", 1.0))
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f"'speed' must be between {MIN_SPEED} and {MAX_SPEED}")
+        fmt = request.get("format", "wav")
+        if fmt not in FORMATS:
+            raise ValueError(f"'format' must be one of {', '.join(FORMATS)}")
+        return text, voice, speed, fmt
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ThreadingHTTPServer counterpart listening on a Unix socket path."""
+    daemon_threads = True
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+        super().server_bind()
+
+def make_server(tts, host="127.0.0.1", port=8765, socket_path=None):
+    """HTTP server bound to host:port, or to socket_path if given, serving the TTSService tts."""
+    if socket_path:
+        server = UnixHTTPServer(socket_path, TTSRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), TTSRequestHandler)
+    server.tts = tts
+    return server
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+def _connect(server, timeout):
+    """Connection for a server address: 'unix:/path/to.sock' or 'http://host:port'."""
+    if server.startswith("unix:"):
+        return _UnixHTTPConnection(server[len("unix:"):], timeout=timeout)
+    address = server.split("://", 1)[-1].rstrip("/")
+    host, _, port = address.partition(":")
+    return http.client.HTTPConnection(host, int(port or 80), timeout=timeout)
+
+def stream_remote(server, text, sink, voice=DEFAULT_VOICE, speed=1.0, timeout=300):
+    """
+    Synthesize text on a running tts_server and write the audio to sink (any object
+    with write(float32 array), see audio_sink) as it arrives. Returns the number of samples.
+    """
+    conn = _connect(server, timeout)
+    try:
+        body = json.dumps({"text": text, "voice": voice, "speed": speed, "format": "f32"})
+        conn.request("POST", "/synthesize", body=body.encode("utf-8"),
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        if resp.status != 200:
+            raise RuntimeError(f"TTS server returned {resp.status}: {resp.read().decode('utf-8', 'replace')}")
+        samples = 0
+        pending = b""
+        while True:
+            data = resp.read1(65536)
+            if not data:
+                break
+            pending += data
+            usable = len(pending) - len(pending) % 4
+            if usable:
+                audio = np.frombuffer(pending[:usable], dtype="<f4")
+                sink.write(audio)
+                samples += len(audio)
+                pending = pending[usable:]
+        return samples
+    finally:
+        conn.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve Kokoro TTS over local HTTP or a Unix socket.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on (default: 8765)")
+    parser.add_argument("--socket", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--device", help="torch device (default: best available)")
+    parser.add_argument("--voice", default=DEFAULT_VOICE, help="voice to load at startup (default: ef_dora)")
+    parser.add_argument("--batch-size", type=int, default=1, help="chunks per model forward pass (default: 1)")
+    parser.add_argument("--max-batch", type=int, default=1,
+                        help="serve up to N requests at once, batching their chunks together (default: 1)")
+    parser.add_argument("--max-wait-ms", type=float, default=20,
+                        help="longest a chunk waits for a batch to fill, in ms (default: 20)")
+    parser.add_argument("--queue-size", type=int, default=16,
+                        help="requests allowed to wait before new ones get 503 (default: 16)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    tts = TTSService(args.device, batch_size=args.batch_size, queue_size=args.queue_size,
+                     max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    t0 = time.time()
+    warm_up(tts.device, voice=args.voice, text="Hola.")
+    print(f"[INFO] Loaded {args.voice} on {tts.device} in {time.time() - t0:.2f}s")
+    server = make_server(tts, args.host, args.port, args.socket)
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"[INFO] Kokoro TTS server listening on {where}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        tts.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# Kokoro voice packs converted once into a flat file (small JSON header plus one
+# contiguous float32 or float16 array) that is memory-mapped on load: no hub
+# lookup or torch.load at runtime, and processes loading the same pack share its
+# pages. The registry uses these when KOKORO_VOICE_DIR is set.
+# Usage: python voice_pack.py --out voices ef_dora [af_bella ...] [--dtype float16]
+
+import argparse
+import json
+import os
+import struct
+import numpy as np
+
+MAGIC = b"KVP1"
+ALIGN = 64
+DTYPES = ("float32", "float16")
+
+def _data_offset(header_len):
+    """Start of the array data: after magic, length and header, rounded up to ALIGN bytes."""
+    return -(-(len(MAGIC) + 4 + header_len) // ALIGN) * ALIGN
+
+def voice_path(voice_dir, voice):
+    return os.path.join(voice_dir, f"{voice}.kvp")
+
+def save_voice_pack(pack, path, dtype="float32", voice=None):
+    """Write a voice pack (tensor or array) as MAGIC, header length, JSON header, padding and raw data."""
+    if dtype not in DTYPES:
+        raise ValueError(f"dtype must be one of {DTYPES}, got {dtype!r}")
+    if hasattr(pack, "detach"):
+        pack = pack.detach().cpu().float().numpy()
+    data = np.ascontiguousarray(pack, dtype="<f4" if dtype == "float32" else "<f2")
+    header = json.dumps({"voice": voice, "dtype": dtype, "shape": list(data.shape)}).encode("utf-8")
+    offset = _data_offset(len(header))
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        f.write(b"\0" * (offset - f.tell()))
+        f.write(data.tobytes())
+    os.replace(tmp, path)
+
+def read_header(path):
+    """Return (header dict, data offset) of a voice pack file."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a voice pack file")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length).decode("utf-8"))
+    return header, _data_offset(length)
+
+def load_voice_pack(path):
+    """
+    Memory-map a voice pack file as a float32 torch tensor. The mapping is
+    copy-on-write, so the file is never modified; float16 packs are converted
+    to float32 on load (a private copy, ~0.5 MB per pack).
+    """
+    import torch
+    header, offset = read_header(path)
+    dtype = "<f4" if header["dtype"] == "float32" else "<f2"
+    data = np.memmap(path, dtype=dtype, mode="c", offset=offset, shape=tuple(header["shape"]))
+    if header["dtype"] != "float32":
+        data = data.astype(np.float32)
+    return torch.from_numpy(data)
+
+def convert_voice(voice, out_dir, dtype="float32", lang_code=None):
+    """Load a voice with KPipeline (downloading it if needed) and save it into out_dir. Returns the path."""
+    from kokoro import KPipeline
+    name = os.path.splitext(os.path.basename(voice))[0]
+    pipeline = KPipeline(lang_code=lang_code or name[0], model=False)
+    path = voice_path(out_dir, name)
+    save_voice_pack(pipeline.load_voice(voice), path, dtype, voice=name)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert Kokoro voice packs to memory-mappable files.")
+    parser.add_argument("voices", nargs="+", help="voice names (e.g. ef_dora) or .pt files")
+    parser.add_argument("--out", default="voices", help="output directory (default: voices)")
+    parser.add_argument("--dtype", choices=DTYPES, default="float32",
+                        help="storage type; float16 halves the file (default: float32)")
+    args = parser.parse_args()
+    os.makedirs(args.out, exist_ok=True)
+    for voice in args.voices:
+        path = convert_voice(voice, args.out, args.dtype)
+        print(f"{voice} -> {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+
+if __name__ == "__main__":
+    main()
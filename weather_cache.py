@@ -0,0 +1,134 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+class WeatherCache:
+    """
+    TTL cache of OpenWeatherMap responses keyed by (city, units, lang), in memory
+    and optionally in a JSON file so later runs can start from cached data.
+    OpenWeatherMap refreshes observations about every ttl seconds, so an entry is
+    fresh until its observation time `dt` plus ttl (but at least min_refresh after
+    it was fetched, in case the provider lags). Until stale_ttl after fetching, an
+    expired entry is still returned at once while a background thread refreshes
+    it; older entries are fetched synchronously, and are served only if that fails.
+    join_refreshes() waits for background refreshes, so short runs still store them.
+    """
+    def __init__(self, ttl=600, stale_ttl=3600, min_refresh=60, path=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.min_refresh = min_refresh
+        self.path = path
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._refreshing = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    stored = json.load(f)
+                self._entries = {tuple(key.split("|")): entry for key, entry in stored.items()}
+            except (OSError, ValueError) as e:
+                print(f"[INFO] Ignoring unreadable weather cache {path}: {e}")
+
+    def _expires(self, entry):
+        observed = entry["data"].get("dt", entry["fetched_at"])
+        return max(observed + self.ttl, entry["fetched_at"] + self.min_refresh)
+
+    def get_or_fetch(self, key, fetch):
+        """Return the weather JSON for key, calling fetch() only when the cached entry is not usable."""
+        data = self.lookup(key, fetch)
+        if data is not None:
+            return data
+        try:
+            data = fetch()
+        except Exception as e:
+            return self.fallback(key, e)
+        self.put(key, data)
+        return data
+
+    def lookup(self, key, refresh):
+        """
+        Return the cached weather JSON for key if it is fresh, or stale but recent
+        enough (then refresh(), a blocking fetch, runs in a background thread).
+        Returns None when the caller has to fetch and put() the data itself.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < self._expires(entry):
+                self.hits += 1
+                return entry["data"]
+            if entry is not None and now < entry["fetched_at"] + self.stale_ttl:
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    thread = threading.Thread(target=self._refresh, args=(key, refresh), daemon=True)
+                    self._refreshing[key] = thread
+                    thread.start()
+                return entry["data"]
+            self.misses += 1
+            return None
+
+    def fallback(self, key, error):
+        """After a failed fetch, return the cached entry however old it is, or raise error if there is none."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            raise error
+        print(f"[INFO] Weather request failed ({error}); using data fetched {time.time() - entry['fetched_at']:.0f}s ago")
+        return entry["data"]
+
+    def _refresh(self, key, fetch):
+        try:
+            self.put(key, fetch())
+        except Exception as e:
+            print(f"[INFO] Background weather refresh for {key[0]} failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def join_refreshes(self, timeout=10):
+        """Wait up to timeout seconds in total for background refreshes to finish."""
+        deadline = time.time() + timeout
+        with self._lock:
+            threads = list(self._refreshing.values())
+        for thread in threads:
+            thread.join(max(0, deadline - time.time()))
+
+    def put(self, key, data):
+        with self._lock:
+            self._entries[key] = {"fetched_at": time.time(), "data": data}
+            if self.path:
+                self._save()
+
+    def _save(self):
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"|".join(key): entry for key, entry in self._entries.items()}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses}
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+def get_weather_cache():
+    """
+    Process-wide weather cache. WEATHER_CACHE names a JSON file to keep it across
+    runs and WEATHER_CACHE_TTL sets the freshness window in seconds (default 600).
+    """
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = WeatherCache(
+                ttl=float(os.environ.get("WEATHER_CACHE_TTL", 600)),
+                path=os.environ.get("WEATHER_CACHE") or None,
+            )
+            # Daemon refresh threads would otherwise die with a short run before storing their result
+            atexit.register(_default_cache.join_refreshes)
+        return _default_cache
@@ -1,89 +1,121 @@
 # Requirements: pip install requests soundfile numpy torch psutil
 # Also requires: Kokoro TTS, Ollama running with qwen3:0.6b pulled, mpv (for playback)
 
+import argparse
 import os
 import requests
 import json
-import soundfile as sf
-import numpy as np
-import torch
-import kokoro
+import re
 import time
-import psutil
-from text_splitter import split_text_for_tts, safe_tts_chunks
+from http_client import get_session
+from report_cache import ReportCache, get_report_cache, quantize_weather
+from weather_cache import get_weather_cache
+# torch, kokoro, numpy, soundfile and psutil (and the modules that pull them in)
+# are imported inside the TTS functions, so --help, --no-tts and the weather and
+# report steps start without loading them (see bench_startup.py).
 from datetime import datetime, timedelta, timezone
 
-def get_weather(api_key, city="Montevideo,UY"):
-    """Fetch weather data from OpenWeatherMap for a given city (default: Montevideo,UY)."""
-    url = f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric&lang=es"
-    resp = requests.get(url)
-    resp.raise_for_status()
-    return resp.json()
+OLLAMA_URL = "http://localhost:11434/api/generate"
+OLLAMA_MODEL = "gemma3:4b"
+
+def weather_url(api_key, city="Montevideo,UY", units="metric", lang="es"):
+    """OpenWeatherMap current weather URL for a city (metric units and Spanish by default)."""
+    return f"https://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units={units}&lang={lang}"
+
+def get_weather(api_key, city="Montevideo,UY", units="metric", lang="es", use_cache=True):
+    """
+    Fetch weather data from OpenWeatherMap for a given city (default: Montevideo,UY).
+    Recent responses are served from the weather cache (see weather_cache).
+    """
+    def fetch():
+        resp = get_session().get(weather_url(api_key, city, units, lang))
+        resp.raise_for_status()
+        return resp.json()
+    if not use_cache:
+        return fetch()
+    return get_weather_cache().get_or_fetch((city, units, lang), fetch)
 
 def format_decimal(value):
     """Format a float as Spanish text with 'punto' instead of dot for decimals."""
-    s = f"{value:.2f}".replace('.', ' punto ')
-    # Remove trailing '00' if integer
-    if s.endswith(' punto 00'):
-        s = s[:-8]
-    return s
+    # Drop trailing zeros so 17.40 reads "17 punto 4" and 5.00 reads "5"
+    s = f"{value:.2f}".rstrip('0').rstrip('.')
+    return s.replace('.', ' punto ')
 
 def format_timestamp(ts, tz_offset):
     """Format a Unix timestamp and timezone offset as a Spanish datetime string for Montevideo."""
     dt = datetime.utcfromtimestamp(ts) + timedelta(seconds=tz_offset)
     return dt.strftime('%H:%M:%S del %d/%m/%Y')
 
-def ollama_weather_report(weather_json):
-    """Generate a Spanish weather report using Ollama LLM from weather JSON, with no markup/tags."""
+def weather_fields(weather_json):
+    """Extract and format the report fields from OpenWeatherMap JSON (numbers as Spanish text)."""
     tz_offset = weather_json.get('timezone', 0)
-    dt_str = format_timestamp(weather_json['dt'], tz_offset)
-    sunrise_str = format_timestamp(weather_json['sys']['sunrise'], tz_offset)
-    sunset_str = format_timestamp(weather_json['sys']['sunset'], tz_offset)
-    temp = format_decimal(weather_json['main']['temp'])
-    feels_like = format_decimal(weather_json['main']['feels_like'])
-    temp_min = format_decimal(weather_json['main']['temp_min'])
-    temp_max = format_decimal(weather_json['main']['temp_max'])
-    humidity = weather_json['main']['humidity']
-    wind_speed = format_decimal(weather_json['wind']['speed'])
-    clouds = weather_json['clouds']['all']
-    city = weather_json['name']
-    country = weather_json['sys']['country']
-    weather_desc = weather_json['weather'][0]['description']
-    visibility = weather_json.get('visibility', None)
-    prompt = (
+    return {
+        "dt_str": format_timestamp(weather_json['dt'], tz_offset),
+        "sunrise_str": format_timestamp(weather_json['sys']['sunrise'], tz_offset),
+        "sunset_str": format_timestamp(weather_json['sys']['sunset'], tz_offset),
+        "temp": format_decimal(weather_json['main']['temp']),
+        "feels_like": format_decimal(weather_json['main']['feels_like']),
+        "temp_min": format_decimal(weather_json['main']['temp_min']),
+        "temp_max": format_decimal(weather_json['main']['temp_max']),
+        "humidity": weather_json['main']['humidity'],
+        "wind_speed": format_decimal(weather_json['wind']['speed']),
+        "clouds": weather_json['clouds']['all'],
+        "city": weather_json['name'],
+        "country": weather_json['sys']['country'],
+        "weather_desc": weather_json['weather'][0]['description'],
+        "visibility": weather_json.get('visibility', None),
+    }
+
+def build_weather_prompt(weather_json):
+    """Build the Ollama prompt for a Spanish weather report from OpenWeatherMap JSON."""
+    f = weather_fields(weather_json)
+    return (
         f"Eres una meteoróloga uruguaya joven y simpática. Escribe un informe del tiempo completo pero breve en español, "
-        f"usando exclusivamente los siguientes datos ya preformateados para Montevideo, Uruguay. Sé clara, fresca, natural y un poco conversacional, como si hablaras con amigos o familia. "
+        f"usando exclusivamente los siguientes datos ya preformateados para {f['city']} ({f['country']}). Sé clara, fresca, natural y un poco conversacional, como si hablaras con amigos o familia. "
         f"Cuando menciones números decimales, usa la palabra 'punto' en vez del símbolo. "
         f"Haz el informe más interesante y útil para el público general, agregando explicaciones o consejos prácticos sobre el clima, pero sin inventar datos. "
-        f"Hora local actual: {dt_str}. "
-        f"Salida del sol: {sunrise_str}. "
-        f"Puesta del sol: {sunset_str}. "
-        f"Temperatura actual: {temp} grados Celsius. "
-        f"Sensación térmica: {feels_like} grados. "
-        f"Temperatura mínima: {temp_min} grados, máxima: {temp_max} grados. "
-        f"Humedad: {humidity} por ciento. "
-        f"Viento: {wind_speed} kilómetros por hora. "
-        f"Nubosidad: {clouds} por ciento. "
-        f"Condición principal: {weather_desc}. "
-        + (f"Visibilidad: {visibility} metros. " if visibility is not None else "")
+        f"Hora local actual: {f['dt_str']}. "
+        f"Salida del sol: {f['sunrise_str']}. "
+        f"Puesta del sol: {f['sunset_str']}. "
+        f"Temperatura actual: {f['temp']} grados Celsius. "
+        f"Sensación térmica: {f['feels_like']} grados. "
+        f"Temperatura mínima: {f['temp_min']} grados, máxima: {f['temp_max']} grados. "
+        f"Humedad: {f['humidity']} por ciento. "
+        f"Viento: {f['wind_speed']} kilómetros por hora. "
+        f"Nubosidad: {f['clouds']} por ciento. "
+        f"Condición principal: {f['weather_desc']}. "
+        + (f"Visibilidad: {f['visibility']} metros. " if f['visibility'] is not None else "")
         + "No uses ningún tipo de marcado, etiquetas, ni formato especial: solo texto plano, ya que el resultado será leído por un sistema TTS. "
         + "No inventes ni asumas datos que no estén explícitamente presentes arriba. "
         + "Redacta el informe de forma natural y humana, explicando el significado de los valores para el público general."
     )
-    ollama_url = "http://localhost:11434/api/generate"
+
+def clean_report(raw):
+    """Remove <think>...</think> blocks and surrounding whitespace from an LLM response."""
+    return re.sub(r'<think>.*?</think>', '', raw, flags=re.DOTALL|re.IGNORECASE).strip()
+
+def ollama_weather_report(weather_json, use_cache=True):
+    """
+    Generate a Spanish weather report using Ollama LLM from weather JSON, with no markup/tags.
+    A report generated earlier from the same prompt is reused (see report_cache).
+    """
+    prompt = build_weather_prompt(weather_json)
+    key = ReportCache.key(OLLAMA_MODEL, prompt)
+    if use_cache:
+        report = get_report_cache().get(key)
+        if report is not None:
+            return report
     data = {
-        "model": "gemma3:4b",
+        "model": OLLAMA_MODEL,
         "prompt": prompt,
         "stream": False
     }
     try:
-        response = requests.post(ollama_url, json=data, timeout=60)
+        response = get_session().post(OLLAMA_URL, json=data)
         response.raise_for_status()
-        raw = response.json()["response"].strip()
-        # Remove <think>...</think> blocks if present
-        import re
-        cleaned = re.sub(r'<think>.*?</think>', '', raw, flags=re.DOTALL|re.IGNORECASE).strip()
-        return cleaned
+        report = clean_report(response.json()["response"])
+        get_report_cache().put(key, report)
+        return report
     except requests.exceptions.ConnectionError:
         print("[ERROR] Ollama server is not running at http://localhost:11434. Please start Ollama.")
         raise
@@ -91,61 +123,414 @@ def ollama_weather_report(weather_json):
         print(f"[ERROR] Ollama request failed: {e}")
         raise
 
-def select_device():
-    """Select the best available device: CUDA, MPS, or CPU."""
-    if torch.cuda.is_available():
-        return "cuda"
-    elif torch.backends.mps.is_available():
-        return "mps"
-    else:
-        return "cpu"
+class ThinkStripper:
+    """Incremental clean_report for streamed text: drops <think>...</think> blocks, even when tags are split across pieces."""
+    OPEN, CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self.pending = ""
+        self.thinking = False
+
+    def feed(self, text):
+        """Return the visible text that is final once text has been added."""
+        self.pending += text
+        out = []
+        while True:
+            tag = self.CLOSE if self.thinking else self.OPEN
+            i = self.pending.lower().find(tag)
+            if i < 0:
+                break
+            if not self.thinking:
+                out.append(self.pending[:i])
+            self.pending = self.pending[i + len(tag):]
+            self.thinking = not self.thinking
+        # Hold back a tail that could be the start of the next tag
+        keep = next((k for k in range(min(len(tag) - 1, len(self.pending)), 0, -1)
+                     if self.pending[-k:].lower() == tag[:k]), 0)
+        if not self.thinking:
+            out.append(self.pending[:len(self.pending) - keep])
+        self.pending = self.pending[len(self.pending) - keep:]
+        return "".join(out)
+
+    def close(self):
+        rest = "" if self.thinking else self.pending
+        self.pending = ""
+        return rest
+
+def stream_ollama_report(weather_json, use_cache=True):
+    """Like ollama_weather_report, but yields the report text piece by piece as Ollama generates it."""
+    prompt = build_weather_prompt(weather_json)
+    key = ReportCache.key(OLLAMA_MODEL, prompt)
+    if use_cache:
+        report = get_report_cache().get(key)
+        if report is not None:
+            yield report
+            return
+    data = {
+        "model": OLLAMA_MODEL,
+        "prompt": prompt,
+        "stream": True
+    }
+    stripper = ThinkStripper()
+    parts = []
+    try:
+        with get_session().post(OLLAMA_URL, json=data, stream=True) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                part = json.loads(line)
+                if "error" in part:
+                    raise RuntimeError(part["error"])
+                text = stripper.feed(part.get("response", ""))
+                if text:
+                    parts.append(text)
+                    yield text
+                if part.get("done"):
+                    break
+    except requests.exceptions.ConnectionError:
+        print("[ERROR] Ollama server is not running at http://localhost:11434. Please start Ollama.")
+        raise
+    except Exception as e:
+        print(f"[ERROR] Ollama request failed: {e}")
+        raise
+    rest = stripper.close()
+    if rest:
+        parts.append(rest)
+        yield rest
+    get_report_cache().put(key, "".join(parts).strip())
 
-def tts_kokoro(text, lang="es", device=None):
-    """Synthesize text to speech using Kokoro TTS, handling long texts and benchmarking."""
+def tts_kokoro_incremental(pieces, device=None, play=False, out_path="weather_report_es.wav", precision=None):
+    """
+    Synthesize text that arrives in pieces (e.g. from stream_ollama_report): each
+    sentence is synthesized and written as soon as it is complete, so audio starts
+    after the first sentence instead of after the whole text.
+    """
+    from audio_cache import get_audio_cache
+    from audio_sink import TeeSink
+    from text_splitter import iter_sentence_chunks, synthesize_cached_chunk
+    from tts_registry import get_tts
+    voice = "ef_dora"
+    model = None
+    audio_cache = get_audio_cache()
+    t0 = time.time()
+    first_audio = None
+    total_len = 0
+    with TeeSink(_open_sinks(out_path, play)) as sink:
+        for chunk in iter_sentence_chunks(pieces, lang_code='e'):
+            if model is None:
+                # Fetched once the first sentence is written, so a preload can finish meanwhile
+                model, pipeline, pack = get_tts(device, 'e', voice, precision)
+            for audio in synthesize_cached_chunk(pipeline, model, pack, chunk, voice, audio_cache):
+                if first_audio is None:
+                    first_audio = time.time() - t0
+                sink.write(audio)
+                total_len += len(audio)
+    if total_len == 0:
+        print("\nNo audio generated.")
+        os.remove(out_path)
+        return None
+    print(f"\nKokoro TTS: {total_len/24000:.2f}s audio, time: {time.time()-t0:.2f}s (including LLM generation), device: {model.device}")
+    print(f"Time to first audio: {first_audio:.2f}s")
+    print(f"Audio saved to {out_path}")
+    return out_path
+
+def _echo(pieces):
+    """Print text pieces as they pass through."""
+    for piece in pieces:
+        print(piece, end="", flush=True)
+        yield piece
+
+def tts_kokoro(text, lang="es", device=None, batch_size=1, stream=False, play=False,
+               out_path="weather_report_es.wav", pipelined=False, workers=0, threads_per_worker=1, precision=None):
+    """
+    Synthesize text to speech using Kokoro TTS, handling long texts and benchmarking.
+    batch_size > 1 runs several chunks per forward pass (faster on CPU for long texts).
+    With stream=True each chunk is appended to the WAV file (and played with mpv if
+    play=True) as soon as it is synthesized, so memory stays flat and audio starts
+    after the first chunk instead of the last. pipelined=True streams too, but runs
+    G2P, inference and file writing in overlapping stages (see tts_pipeline).
+    workers > 0 spreads chunks over that many processes, each with its own model
+    running threads_per_worker intra-op threads (see synth_pool). precision selects
+    fp32, bf16, fp16 or int8 inference (see precision.py; default KOKORO_PRECISION).
+    """
+    if workers and pipelined:
+        raise ValueError("pipelined mode runs in one process; it cannot be combined with workers")
+    if workers and batch_size > 1:
+        raise ValueError("workers synthesize one chunk at a time; batch_size cannot be combined with workers")
+    import numpy as np
+    import psutil
+    import soundfile as sf
+    from audio_cache import get_audio_cache
+    from audio_sink import TeeSink
+    from g2p_cache import get_g2p_cache
+    from synth_pool import get_synth_pool
+    from text_splitter import SPLIT_STATS, iter_tts_chunks
+    from tts_pipeline import format_stage_stats, run_staged_tts
+    from tts_registry import get_tts, registry_stats, select_device
     if device is None:
-        device = select_device()
-    from kokoro import KModel, KPipeline
+        device = "cpu" if workers else select_device()
     voice = "ef_dora"  # Use a Spanish voice as in basic_test.py
-    model = KModel().to(device).eval()
-    pipeline = KPipeline(lang_code='e', model=model)
-    pack = pipeline.load_voice(voice)
+    if workers:
+        # Each worker process holds its own model; nothing is loaded in this process
+        pool = get_synth_pool(workers, threads_per_worker, device, voice, precision)
+
+        def chunk_source():
+            return pool.iter_chunks(text)
+    else:
+        # Loaded once per process; repeated reports only pay synthesis time
+        model, pipeline, pack = get_tts(device, 'e', voice, precision)
+
+        def chunk_source():
+            return iter_tts_chunks(pipeline, model, pack, text, voice, batch_size=batch_size)
     t0 = time.time()
     process = psutil.Process(os.getpid())
     mem_before = process.memory_info().rss
-    audio_segments = safe_tts_chunks(pipeline, model, pack, text, voice)
-    total_len = sum(len(seg) for seg in audio_segments)
+    first_audio = None
+    stage_stats = None
+    if pipelined:
+        with TeeSink(_open_sinks(out_path, play)) as sink:
+            counter = _CountingSink(sink)
+            stage_stats = run_staged_tts(pipeline, model, pack, text, voice, counter, batch_size=batch_size)
+        total_len = counter.samples
+        first_audio = stage_stats["first_audio"]
+    elif stream:
+        total_len = 0
+        with TeeSink(_open_sinks(out_path, play)) as sink:
+            for audio in chunk_source():
+                if first_audio is None:
+                    first_audio = time.time() - t0
+                sink.write(audio)
+                total_len += len(audio)
+    else:
+        audio_segments = list(chunk_source())
+        total_len = sum(len(seg) for seg in audio_segments)
     mem_after = process.memory_info().rss
     t1 = time.time()
     print(f"Kokoro TTS: {total_len/24000:.2f}s audio, time: {t1-t0:.2f}s, mem: {(mem_after-mem_before)/1e6:.1f}MB, device: {device}")
-    out_path = "weather_report_es.wav"
-    if audio_segments:
+    if first_audio is not None:
+        print(f"Time to first audio: {first_audio:.2f}s")
+    if stage_stats is not None:
+        print(format_stage_stats(stage_stats))
+    if workers:
+        # G2P, re-splitting and the audio cache ran in the worker processes
+        ws = pool.stats()
+        print(f"Workers: G2P cache {ws['g2p_hits']} hits, {ws['g2p_disk_hits']} disk hits, {ws['g2p_misses']} misses; "
+              f"audio cache {ws['audio_hits']} hits, {ws['audio_misses']} misses")
+        split = ws
+    else:
+        stats = registry_stats()
+        loads = ", ".join(f"{k}={v:.2f}s" for k, v in stats["load_times"].items())
+        print(f"Model registry: {stats['hits']} hits, {stats['misses']} misses; loads: {loads}")
+        g2p = get_g2p_cache().stats()
+        print(f"G2P cache: {g2p['hits']} hits, {g2p['disk_hits']} disk hits, {g2p['misses']} misses")
+        audio_cache = get_audio_cache()
+        if audio_cache is not None:
+            ac = audio_cache.stats()
+            print(f"Audio cache: {ac['hits']} hits, {ac['misses']} misses ({ac['hit_rate']:.0%}), {ac['bytes']/1e6:.1f}MB")
+        split = SPLIT_STATS
+    if split["resplit"] or split["failed"]:
+        print(f"Re-split {split['resplit']} oversized chunks into {split['pieces']} pieces, "
+              f"{split['failed']} could not be synthesized")
+    if total_len == 0:
+        print("No audio generated.")
+        if stream or pipelined:
+            os.remove(out_path)
+        return None
+    if not (stream or pipelined):
         full_audio = np.concatenate(audio_segments)
         sf.write(out_path, full_audio, 24000)
-        print(f"Audio saved to {out_path}")
-        return out_path
-    else:
+    print(f"Audio saved to {out_path}")
+    return out_path
+
+def tts_remote(text, server, play=False, out_path="weather_report_es.wav"):
+    """
+    Synthesize text on a running tts_server (e.g. http://127.0.0.1:8765 or
+    unix:/tmp/kokoro.sock), writing and optionally playing the audio as it streams in.
+    """
+    from audio_sink import TeeSink
+    from tts_server import stream_remote
+    t0 = time.time()
+    with TeeSink(_open_sinks(out_path, play)) as sink:
+        total_len = stream_remote(server, text, sink, voice="ef_dora")
+    print(f"Kokoro TTS (server {server}): {total_len/24000:.2f}s audio, time: {time.time()-t0:.2f}s")
+    if total_len == 0:
         print("No audio generated.")
+        os.remove(out_path)
         return None
+    print(f"Audio saved to {out_path}")
+    return out_path
 
-def main():
+def tts_phrase_bank(weather_json, bank_dir, out_path="weather_report_es.wav", precision=None):
+    """
+    Template report assembled from the pre-rendered audio in a phrase bank (see
+    phrase_bank.py); only values not in the bank, such as the city name, are synthesized.
+    """
+    import soundfile as sf
+    from phrase_bank import PhraseBank
+    from template_report import template_weather_segments
+    bank = PhraseBank(bank_dir, precision=precision)
+    t0 = time.time()
+    audio = bank.assemble(template_weather_segments(weather_json))
+    elapsed = time.time() - t0
+    sf.write(out_path, audio, 24000)
+    print(f"[TIME] Assembled {len(audio) / 24000:.1f}s of audio in {elapsed:.2f}s "
+          f"({bank.novel} novel pieces synthesized, {bank.rendered} phrases added to the bank)")
+    print(f"Audio saved to {out_path}")
+    return out_path
+
+def report_path(city):
+    """Output WAV path for a city, e.g. weather_report_montevideo_uy.wav."""
+    return "weather_report_" + re.sub(r'\W+', '_', city.lower()).strip('_') + ".wav"
+
+class _CountingSink:
+    """Pass-through sink that counts samples written."""
+    def __init__(self, sink):
+        self.sink = sink
+        self.samples = 0
+
+    def write(self, audio):
+        self.sink.write(audio)
+        self.samples += len(audio)
+
+def _open_sinks(out_path, play):
+    """WAV file sink, plus an mpv playback sink if requested and available."""
+    from audio_sink import MpvSink, WavSink
+    sinks = [WavSink(out_path)]
+    if play:
+        try:
+            sinks.append(MpvSink())
+        except OSError as e:
+            print(f"[INFO] Could not play audio: {e}")
+    return sinks
+
+def play_audio(audio_path):
+    """Play a finished audio file with mpv."""
+    try:
+        exit_code = os.system(f"mpv --no-terminal {audio_path} > /dev/null 2>&1")
+        if exit_code != 0:
+            print("[INFO] Could not play audio: mpv not found or playback failed.")
+    except Exception as e:
+        print(f"[INFO] Could not play audio: {e}")
+
+def _await_model(model_load):
+    """Wait for the model load main() started in the background and report the wait."""
+    if model_load is None:
+        return
+    t0 = time.time()
+    try:
+        model_load.result()
+    except Exception as e:
+        # get_tts() retries the load and raises if it fails again
+        print(f"[ERROR] Background model load failed: {e}")
+        return
+    print(f"[TIME] Waited {time.time() - t0:.2f}s for the background model load")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch the weather, write a Spanish report and read it aloud with Kokoro.")
+    parser.add_argument("--stream", action="store_true",
+                        help="write and play audio chunk by chunk while it is synthesized")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="like --stream, with G2P, inference and writing in overlapping stages")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="chunks per model forward pass (default: 1)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="synthesize in N worker processes, each with its own model (CPU)")
+    parser.add_argument("--threads-per-worker", type=int, default=1,
+                        help="torch intra-op threads per worker process (default: 1)")
+    parser.add_argument("--precision", choices=("fp32", "bf16", "fp16", "int8"),
+                        help="inference precision: bf16/fp16 autocast or int8 dynamic quantization on CPU "
+                             "(default: KOKORO_PRECISION or fp32; compare with bench_precision.py)")
+    parser.add_argument("--generator", choices=("llm", "template"), default="llm",
+                        help="write the report with Ollama (default) or with fast phrase templates")
+    parser.add_argument("--phrase-bank", metavar="DIR",
+                        help="with --generator template, splice the audio from pre-rendered phrases in DIR")
+    parser.add_argument("--stream-llm", action="store_true",
+                        help="stream the Ollama response and synthesize each sentence as soon as it is written")
+    parser.add_argument("--tts-server",
+                        help="synthesize on a running tts_server, e.g. http://127.0.0.1:8765 or unix:/tmp/kokoro.sock")
+    parser.add_argument("--coarse", action="store_true",
+                        help="round the weather values (e.g. to whole degrees) so close readings reuse a cached report")
+    parser.add_argument("--no-cache", action="store_true", help="always fetch fresh weather data and write a new report")
+    parser.add_argument("--no-tts", action="store_true", help="only print the report; do not load Kokoro")
+    parser.add_argument("--no-play", action="store_true", help="do not play the audio")
+    args = parser.parse_args(argv)
+    # --stream-llm and --phrase-bank synthesize locally in their own way
+    synthesis = {"--tts-server": bool(args.tts_server), "--workers": bool(args.workers),
+                 "--batch-size": args.batch_size != 1, "--pipelined": args.pipelined}
+    if args.workers and args.batch_size != 1:
+        parser.error("--workers synthesizes one chunk per worker at a time; it cannot be combined with --batch-size")
+    if args.stream_llm:
+        if args.generator != "llm":
+            parser.error("--stream-llm needs --generator llm")
+        conflicts = [flag for flag, used in synthesis.items() if used]
+        if conflicts:
+            parser.error(f"--stream-llm cannot be combined with {', '.join(conflicts)}")
+    if args.phrase_bank:
+        if args.generator != "template":
+            parser.error("--phrase-bank needs --generator template")
+        conflicts = [flag for flag, used in dict(synthesis, **{"--stream": args.stream}).items() if used]
+        if conflicts:
+            parser.error(f"--phrase-bank cannot be combined with {', '.join(conflicts)}")
+    return args
+
+def main(argv=None):
     """Main pipeline: fetch weather, generate report, synthesize audio, and play it."""
+    args = parse_args(argv)
     api_key = os.environ.get("OPENWEATHER_KEY")
     if not api_key:
         raise RuntimeError("OPENWEATHER_KEY environment variable not set.")
-    weather = get_weather(api_key)
+    model_load = None
+    if not (args.no_tts or args.tts_server or args.workers):
+        # Load the model while the weather and report are fetched; get_tts() waits for it
+        from tts_registry import preload
+        model_load = preload(voice="ef_dora", precision=args.precision)
+    weather = get_weather(api_key, use_cache=not args.no_cache)
     print("Weather JSON:", json.dumps(weather, indent=2, ensure_ascii=False))
-    report = ollama_weather_report(weather)
+    if args.coarse:
+        weather = quantize_weather(weather)
+    wc = get_weather_cache().stats()
+    if wc["hits"] or wc["stale_hits"]:
+        print(f"[INFO] Weather served from cache (observed {format_timestamp(weather['dt'], weather.get('timezone', 0))})")
+    play = not args.no_play
+    if args.stream_llm and not args.no_tts:
+        print("\nWeather report (Spanish):")
+        audio_path = tts_kokoro_incremental(_echo(stream_ollama_report(weather, not args.no_cache)), play=play,
+                                            precision=args.precision)
+        print(f"Audio file: {audio_path}")
+        return
+    if args.phrase_bank and not args.no_tts:
+        from template_report import template_weather_report
+        print("\nWeather report (Spanish):\n", template_weather_report(weather))
+        _await_model(model_load)
+        audio_path = tts_phrase_bank(weather, args.phrase_bank, precision=args.precision)
+        print(f"Audio file: {audio_path}")
+        if play:
+            play_audio(audio_path)
+        return
+    if args.generator == "template":
+        from template_report import template_weather_report
+        report = template_weather_report(weather)
+    else:
+        report = ollama_weather_report(weather, use_cache=not args.no_cache)
+        if get_report_cache().stats()["hits"]:
+            print("[INFO] Report reused from the report cache")
     print("\nWeather report (Spanish):\n", report)
-    audio_path = tts_kokoro(report, lang="es")
+    if args.no_tts:
+        return
+    streamed = args.stream or args.pipelined or bool(args.tts_server)
+    if args.tts_server:
+        audio_path = tts_remote(report, args.tts_server, play=play)
+    else:
+        _await_model(model_load)
+        audio_path = tts_kokoro(report, lang="es", batch_size=args.batch_size, stream=args.stream,
+                                play=play and streamed, pipelined=args.pipelined,
+                                workers=args.workers, threads_per_worker=args.threads_per_worker,
+                                precision=args.precision)
     print(f"Audio file: {audio_path}")
-    # Optionally, play audio (requires mpv)
-    if audio_path:
-        try:
-            exit_code = os.system(f"mpv --no-terminal {audio_path} > /dev/null 2>&1")
-            if exit_code != 0:
-                print("[INFO] Could not play audio: mpv not found or playback failed.")
-        except Exception as e:
-            print(f"[INFO] Could not play audio: {e}")
+    # Optionally, play audio (requires mpv); streaming modes already played it
+    if audio_path and play and not streamed:
+        play_audio(audio_path)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,131 @@
+# asyncio version of weather_report.py: weather and Ollama requests for any number
+# of cities run concurrently while the Kokoro model loads, and synthesis runs in
+# a worker thread so it never blocks the event loop.
+# Requirements: pip install aiohttp (plus everything weather_report.py needs)
+# Usage: python weather_report_async.py --city Montevideo,UY --city "Buenos Aires,AR"
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import aiohttp
+from http_client import timeout_for
+from report_cache import ReportCache, get_report_cache
+from tts_registry import warm_up
+from weather_cache import get_weather_cache
+from weather_report import (OLLAMA_MODEL, OLLAMA_URL, build_weather_prompt, clean_report, get_weather,
+                            play_audio, report_path, tts_kokoro, weather_url)
+
+def client_timeout(url):
+    """aiohttp timeout matching http_client's per-host (connect, read) timeouts."""
+    connect, read = timeout_for(url)
+    return aiohttp.ClientTimeout(sock_connect=connect, sock_read=read)
+
+async def get_weather_async(session, api_key, city="Montevideo,UY", use_cache=True):
+    """
+    Fetch weather data from OpenWeatherMap for a given city without blocking the
+    loop. Uses the same weather cache as get_weather; stale entries are refreshed
+    in a background thread.
+    """
+    url = weather_url(api_key, city)
+    key = (city, "metric", "es")
+    cache = get_weather_cache()
+    if use_cache:
+        weather = cache.lookup(key, partial(get_weather, api_key, city, use_cache=False))
+        if weather is not None:
+            return weather
+    try:
+        async with session.get(url, timeout=client_timeout(url)) as resp:
+            resp.raise_for_status()
+            weather = await resp.json()
+    except Exception as e:
+        if not use_cache:
+            raise
+        return cache.fallback(key, e)
+    cache.put(key, weather)
+    return weather
+
+async def ollama_weather_report_async(session, weather_json, use_cache=True):
+    """
+    Async ollama_weather_report: generate a Spanish weather report with Ollama.
+    The report cache (sqlite) is read and written in a thread, off the loop.
+    """
+    prompt = build_weather_prompt(weather_json)
+    key = ReportCache.key(OLLAMA_MODEL, prompt)
+    cache = await asyncio.to_thread(get_report_cache)
+    if use_cache:
+        report = await asyncio.to_thread(cache.get, key)
+        if report is not None:
+            return report
+    data = {"model": OLLAMA_MODEL, "prompt": prompt, "stream": False}
+    try:
+        async with session.post(OLLAMA_URL, json=data, timeout=client_timeout(OLLAMA_URL)) as resp:
+            resp.raise_for_status()
+            report = clean_report((await resp.json())["response"])
+    except aiohttp.ClientConnectorError:
+        print("[ERROR] Ollama server is not running at http://localhost:11434. Please start Ollama.")
+        raise
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        print(f"[ERROR] Ollama request failed: {str(e) or type(e).__name__}")
+        raise
+    await asyncio.to_thread(cache.put, key, report)
+    return report
+
+async def report_city(session, api_key, city, tts_executor, batch_size=1, use_cache=True):
+    """Fetch, write and synthesize one city's report. Returns (city, report, audio path)."""
+    loop = asyncio.get_running_loop()
+    weather = await get_weather_async(session, api_key, city, use_cache)
+    report = await ollama_weather_report_async(session, weather, use_cache)
+    print(f"\nWeather report for {city}:\n", report)
+    synth = partial(tts_kokoro, report, lang="es", batch_size=batch_size, out_path=report_path(city))
+    audio_path = await loop.run_in_executor(tts_executor, synth)
+    return city, report, audio_path
+
+async def main_async(api_key, cities, batch_size=1, play=True, use_cache=True):
+    """Produce reports for all cities concurrently; returns (city, report, path) or exceptions."""
+    loop = asyncio.get_running_loop()
+    # One thread owns the model: synthesis requests queue up behind the warm-up
+    tts_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts")
+    t0 = time.time()
+    # Device selection imports torch, so it happens in the executor rather than on the loop
+    warm = loop.run_in_executor(tts_executor, warm_up, None, "e", "ef_dora", "Hola.")
+    try:
+        # One keep-alive pool for all cities, sized like http_client's (HTTP_POOL_SIZE)
+        connector = aiohttp.TCPConnector(limit=int(os.environ.get("HTTP_POOL_SIZE", 16)))
+        async with aiohttp.ClientSession(connector=connector) as session:
+            results = await asyncio.gather(
+                *(report_city(session, api_key, city, tts_executor, batch_size, use_cache) for city in cities),
+                return_exceptions=True)
+        await warm
+    finally:
+        tts_executor.shutdown(wait=True)
+    print(f"\n[TIME] {len(cities)} reports in {time.time() - t0:.2f}s")
+    for city, result in zip(cities, results):
+        if isinstance(result, Exception):
+            print(f"[ERROR] {city}: {result}")
+        elif play and result[2]:
+            play_audio(result[2])
+    return results
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Spanish weather reports for several cities, fetched and written concurrently.")
+    parser.add_argument("--city", action="append",
+                        help="OpenWeatherMap city query, repeatable (default: Montevideo,UY)")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="chunks per model forward pass (default: 1)")
+    parser.add_argument("--no-cache", action="store_true", help="always fetch fresh weather data and write new reports")
+    parser.add_argument("--no-play", action="store_true", help="do not play the audio")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    api_key = os.environ.get("OPENWEATHER_KEY")
+    if not api_key:
+        raise RuntimeError("OPENWEATHER_KEY environment variable not set.")
+    asyncio.run(main_async(api_key, args.city or ["Montevideo,UY"], args.batch_size, play=not args.no_play,
+                           use_cache=not args.no_cache))
+
+if __name__ == "__main__":
+    main()